@@ -1,48 +1,348 @@
+import os
+import pickle
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
+from dataclasses import dataclass, field
+from eda_cube import *
 
 warnings.filterwarnings('ignore')
 
-def eda(df):
-    # Настройка отображения
-    plt.style.use('seaborn-v0_8-darkgrid')
-    sns.set_palette("husl")
-    pd.set_option('display.max_columns', None)
-    pd.set_option('display.float_format', lambda x: '%.2f' % x)
+# Дилер, для которого строится отдельный анализ
+TARGET_DEALER = 'Mercur Auto'
 
-    # Создание дополнительных признаков для анализа
+
+def add_date_features(df):
+    """
+    Добавляет признаки для анализа: месяц и квартал продажи, возраст автомобиля на момент продажи
+    """
     df['sale_month'] = df['sale_date'].dt.month
     df['sale_quarter'] = df['sale_date'].dt.quarter
-    df['car_age'] = 2019 - df['year_of_release']
+    df['car_age'] = car_ages(df)
+    return df
+
+
+@dataclass
+class EdaReport:
+    """
+    Результаты EDA: все агрегаты, нужные для печати и графиков, без исходных строк
+    """
+    overview: dict
+    monthly_stats: pd.DataFrame
+    fuel_dist: pd.Series
+    top_brands_sales: pd.DataFrame
+    top_brands_qty: pd.Series
+    most_expensive_brand: object
+    dealer: str = TARGET_DEALER
+    dealer_summary: dict = None
+    dealer_comparison: pd.DataFrame = None
+    dealer_top_brands: pd.DataFrame = None
+    dealer_segments: pd.Series = None
+    region_stats: pd.DataFrame = None
+    top_regions_price: pd.DataFrame = None
+    transmission_dist: pd.Series = None
+    drive_dist: pd.Series = None
+    engine_volume_counts: pd.Series = None
+    car_age_counts: pd.Series = None
+    correlation: pd.DataFrame = None
+    top_correlations: pd.DataFrame = None
+    top_models: pd.DataFrame = None
+    segment_stats: pd.DataFrame = None
+    class_stats: pd.DataFrame = None
+    top_dealers: pd.DataFrame = None
+    dealer_rank: int = None
+    top_missing_brands: pd.Series = None
+    missing_regions: list = field(default_factory=list)
+    summary_stats: pd.DataFrame = None
+
+
+def compute_eda_report(df, dealer=TARGET_DEALER):
+    """
+    Считает все агрегаты EDA, не изменяя df: один проход строит куб, таблицы отчета - его свертки
+    """
+    return report_from_aggregates(build_eda_aggregates(df), dealer)
+
+
+def report_from_aggregates(aggregates, dealer=TARGET_DEALER):
+    """
+    Строит отчет EDA из куба и распределений, не обращаясь к исходным строкам
+    """
+    cube = aggregates.cube
+    totals = cube_totals(cube)
+    total_sales_usd = totals['sale_USD']
+    total_quantity = totals['quantity']
+    age_counts = aggregates.car_age_counts
+    overview = {
+        'total_sales_usd': total_sales_usd,
+        'total_quantity': total_quantity,
+        'avg_price': totals['avg_price'],
+        'avg_sale': totals['avg_sale'],
+        'period_start': aggregates.sale_date_min,
+        'period_end': aggregates.sale_date_max,
+        'dealers': cube['dealer_name'].nunique(),
+        'brands': cube['brand'].nunique(),
+        'avg_car_age': (age_counts.index.to_numpy(dtype='float64') * age_counts.to_numpy()).sum() / age_counts.sum()
+    }
+
+    monthly_stats = rollup(cube, 'sale_month').reset_index()
+
+    brand_stats = rollup(cube, 'brand')
+    top_brands_sales = brand_stats.sort_values('sale_USD', ascending=False).head(10)
+
+    report = EdaReport(
+        overview=overview,
+        monthly_stats=monthly_stats,
+        fuel_dist=aggregates.fuel_dist,
+        top_brands_sales=top_brands_sales,
+        top_brands_qty=brand_stats['quantity'].sort_values(ascending=False).head(10),
+        most_expensive_brand=brand_stats['price_USD'].idxmax() if len(brand_stats) > 0 else 'N/A',
+        dealer=dealer,
+        transmission_dist=aggregates.transmission_dist,
+        drive_dist=aggregates.drive_dist,
+        engine_volume_counts=aggregates.engine_volume_counts,
+        car_age_counts=age_counts
+    )
+
+    # АНАЛИЗ ДИЛЕРА - строки куба, относящиеся к дилеру
+    dealer_cube = cube[cube['dealer_name'] == dealer]
+    if len(dealer_cube) > 0:
+        dealer_totals = cube_totals(dealer_cube)
+        report.dealer_summary = {
+            'dealer': dealer,
+            'sales_usd': dealer_totals['sale_USD'],
+            'quantity': dealer_totals['quantity'],
+            'avg_price': dealer_totals['avg_price'],
+            'share_usd': (dealer_totals['sale_USD'] / total_sales_usd) * 100,
+            'share_qty': (dealer_totals['quantity'] / total_quantity) * 100
+        }
+        report.dealer_comparison = pd.DataFrame({
+            'Показатель': ['Средняя цена', 'Средняя сумма сделки', 'Средний объем двигателя'],
+            dealer: [dealer_totals['avg_price'], dealer_totals['avg_sale'], dealer_totals['avg_engine']],
+            'Весь рынок': [totals['avg_price'], totals['avg_sale'], totals['avg_engine']]
+        })
+        report.dealer_top_brands = rollup(dealer_cube, 'brand')[['sale_USD', 'quantity']].sort_values(
+            'sale_USD', ascending=False).head(5)
+        if 'segment_2013' in dealer_cube.columns:
+            report.dealer_segments = dealer_cube.groupby('segment_2013', observed=True)['rows'].sum().sort_values(
+                ascending=False).rename('count')
+
+    # ГЕОГРАФИЧЕСКИЙ АНАЛИЗ
+    all_regions = None
+    if 'region' in cube.columns:
+        region_stats = rollup(cube, 'region')
+        region_stats['dealer_name'] = count_distinct(cube, 'region', 'dealer_name')
+        region_stats = region_stats.sort_values('sale_USD', ascending=False)
+        all_regions = region_stats['sale_USD']
+        report.region_stats = region_stats.head(10)
+        report.top_regions_price = report.region_stats.sort_values('price_USD', ascending=False).head(10)
+
+    # КОРРЕЛЯЦИОННЫЙ АНАЛИЗ
+    if aggregates.correlation_moments is not None:
+        correlation = correlation_from_moments(aggregates.correlation_moments)
+        report.correlation = correlation
+        corr_pairs = correlation.unstack().sort_values(ascending=False)
+        unique_pairs = pd.DataFrame(corr_pairs).reset_index()
+        unique_pairs = unique_pairs[unique_pairs['level_0'] != unique_pairs['level_1']]
+        report.top_correlations = unique_pairs.head(10)
+
+    # ТОП-10 МОДЕЛЕЙ
+    report.top_models = rollup(cube, ['brand', 'model']).sort_values('sale_USD', ascending=False).head(10)
+
+    # СЕГМЕНТАЦИЯ И КЛАССЫ
+    if 'segment_2013' in cube.columns and 'class_2013' in cube.columns:
+        segments = cube.groupby('segment_2013', observed=True)[CUBE_MEASURES].sum()
+        report.segment_stats = pd.DataFrame({
+            ('sale_USD', 'sum'): segments['sale_USD'],
+            ('sale_USD', 'count'): segments['sale_count'],
+            ('price_USD', 'mean'): segments['price_sum'] / segments['price_count']
+        }).round(2)
+        report.class_stats = rollup(cube, 'class_2013')[['sale_USD', 'quantity']].sort_values(
+            'sale_USD', ascending=False).head(10)
+
+    # АНАЛИЗ КОНКУРЕНТОВ
+    dealer_stats = rollup(cube, 'dealer_name')
+    dealer_stats['brand'] = count_distinct(cube, 'dealer_name', 'brand')
+    report.top_dealers = dealer_stats.sort_values('sale_USD', ascending=False).head(10)
+    if dealer in report.top_dealers.index:
+        report.dealer_rank = report.top_dealers.index.get_loc(dealer) + 1
+
+    # ТОЧКИ РОСТА
+    if len(dealer_cube) > 0:
+        dealer_brands = set(dealer_cube['brand'].unique())
+        missing_brands = [brand for brand in brand_stats.index if brand not in dealer_brands]
+        report.top_missing_brands = brand_stats.loc[missing_brands, 'sale_USD'].sort_values(ascending=False).head(5)
+        if all_regions is not None:
+            dealer_regions = rollup(dealer_cube, 'region')
+            report.missing_regions = list(all_regions.head(10).index.difference(dealer_regions.index))
+
+    # СВОДНАЯ СТАТИСТИКА
+    report.summary_stats = pd.DataFrame({
+        'Показатель': [
+            'Общий объем продаж (USD)',
+            'Общее количество продаж',
+            'Средняя цена автомобиля',
+            'Количество уникальных дилеров',
+            'Количество уникальных марок',
+            'Самый популярный бренд',
+            'Самый дорогой бренд (средняя цена)',
+            'Самый продаваемый месяц',
+            'Средний возраст автомобиля'
+        ],
+        'Значение': [
+            f"${total_sales_usd:,.0f}",
+            f"{total_quantity:,}",
+            f"${overview['avg_price']:,.0f}",
+            overview['dealers'],
+            overview['brands'],
+            top_brands_sales.index[0] if len(top_brands_sales) > 0 else 'N/A',
+            report.most_expensive_brand,
+            monthly_stats.loc[monthly_stats['sale_USD'].idxmax(), 'sale_month'] if len(monthly_stats) > 0 else 'N/A',
+            f"{overview['avg_car_age']:.1f} лет"
+        ]
+    })
+    return report
+
+
+def print_eda_report(report):
+    """
+    Печатает таблицы отчета EDA
+    """
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.float_format', lambda x: '%.2f' % x)
+    overview = report.overview
 
     # ОБЩИЙ ОБЗОР РЫНКА
     print("=" * 60)
     print("ОБЩИЙ ОБЗОР РЫНКА")
     print("=" * 60)
 
-    total_sales_usd = df['sale_USD'].sum()
-    total_quantity = df['quantity'].sum()
-    avg_price = df['price_USD'].mean()
-    avg_sale = df['sale_USD'].mean()
+    print(f"Всего продаж на сумму: ${overview['total_sales_usd']:,.0f}")
+    print(f"Всего продано автомобилей: {overview['total_quantity']:,}")
+    print(f"Средняя цена автомобиля: ${overview['avg_price']:,.0f}")
+    print(f"Средняя сумма сделки: ${overview['avg_sale']:,.0f}")
+    print(f"Период данных: {overview['period_start'].date()} - {overview['period_end'].date()}")
+    print(f"Количество уникальных дилеров: {overview['dealers']}")
+    print(f"Количество уникальных марок: {overview['brands']}")
 
-    print(f"Всего продаж на сумму: ${total_sales_usd:,.0f}")
-    print(f"Всего продано автомобилей: {total_quantity:,}")
-    print(f"Средняя цена автомобиля: ${avg_price:,.0f}")
-    print(f"Средняя сумма сделки: ${avg_sale:,.0f}")
-    print(f"Период данных: {df['sale_date'].min().date()} - {df['sale_date'].max().date()}")
-    print(f"Количество уникальных дилеров: {df['dealer_name'].nunique()}")
-    print(f"Количество уникальных марок: {df['brand'].nunique()}")
+    # ТОП-10 МАРОК ПО ПРОДАЖАМ
+    print("\n" + "=" * 60)
+    print("3. ТОП-10 МАРОК ПО ПРОДАЖАМ")
+    print("=" * 60)
 
-    # ДИНАМИКА ПРОДАЖ ПО МЕСЯЦАМ
-    monthly_stats = df.groupby('sale_month').agg({
-        'sale_USD': 'sum',
-        'quantity': 'sum',
-        'price_USD': 'mean'
-    }).reset_index()
+    print("Топ-10 марок по объему продаж:")
+    print(report.top_brands_sales)
+
+    # АНАЛИЗ ДИЛЕРА
+    print("\n" + "=" * 60)
+    print(f"АНАЛИЗ ПОЗИЦИИ «{report.dealer.upper()}»")
+    print("=" * 60)
+
+    if report.dealer_summary is not None:
+        summary = report.dealer_summary
+        print(f"«{summary['dealer']}» - ключевые показатели:")
+        print(f"- Объем продаж: ${summary['sales_usd']:,.0f}")
+        print(f"- Количество проданных авто: {summary['quantity']}")
+        print(f"- Средняя цена: ${summary['avg_price']:,.0f}")
+        print(f"- Доля рынка (в деньгах): {summary['share_usd']:.2f}%")
+        print(f"- Доля рынка (в штуках): {summary['share_qty']:.2f}%")
+
+        print("\nСравнение с общим рынком:")
+        print(report.dealer_comparison)
+
+        print(f"\nТоп-5 марок у «{summary['dealer']}»:")
+        print(report.dealer_top_brands)
+    else:
+        print(f"Данные по «{report.dealer}» не найдены в датасете")
+
+    # ГЕОГРАФИЧЕСКИЙ АНАЛИЗ
+    print("\n" + "=" * 60)
+    print("ГЕОГРАФИЧЕСКИЙ АНАЛИЗ")
+    print("=" * 60)
+
+    if report.region_stats is not None:
+        print("Топ-10 регионов по объему продаж:")
+        print(report.region_stats)
+
+    # КОРРЕЛЯЦИОННЫЙ АНАЛИЗ
+    print("\n" + "=" * 60)
+    print("КОРРЕЛЯЦИОННЫЙ АНАЛИЗ")
+    print("=" * 60)
+
+    if report.top_correlations is not None:
+        print("Наиболее значимые корреляции:")
+        print(report.top_correlations)
+
+    # ТОП-10 МОДЕЛЕЙ ПО ПРОДАЖАМ
+    print("\n" + "=" * 60)
+    print("ТОП-10 МОДЕЛЕЙ ПО ПРОДАЖАМ")
+    print("=" * 60)
+
+    print("Топ-10 моделей по объему продаж:")
+    print(report.top_models)
+
+    # СЕГМЕНТАЦИЯ И КЛАССЫ
+    print("\n" + "=" * 60)
+    print("АНАЛИЗ ПО СЕГМЕНТАМ И КЛАССАМ")
+    print("=" * 60)
+
+    if report.segment_stats is not None:
+        print("Статистика по сегментам:")
+        print(report.segment_stats)
+
+        print("\nТоп-10 классов по объему продаж:")
+        print(report.class_stats)
+
+    # АНАЛИЗ КОНКУРЕНТОВ
+    print("\n" + "=" * 60)
+    print("АНАЛИЗ КОНКУРЕНТОВ")
+    print("=" * 60)
+
+    print("Топ-10 дилеров по объему продаж:")
+    print(report.top_dealers)
+
+    # Если дилер в топе, покажем его позицию
+    if report.dealer_rank is not None:
+        print(f"\n«{report.dealer}» занимает {report.dealer_rank}-е место среди всех дилеров")
+
+    # ВЫЯВЛЕНИЕ ТОЧЕК РОСТА ДЛЯ ДИЛЕРА
+    print("\n" + "=" * 60)
+    print("ВЫЯВЛЕНИЕ ТОЧЕК РОСТА")
+    print("=" * 60)
+
+    if report.top_missing_brands is not None:
+        print(f"Топ-5 популярных брендов, которых нет у «{report.dealer}»:")
+        print(report.top_missing_brands)
+
+        if report.region_stats is not None:
+            print(f"\nТоп-10 регионов, где «{report.dealer}» отсутствует: {report.missing_regions}")
+
+    # СВОДНАЯ СТАТИСТИКА
+    print("\n" + "=" * 60)
+    print("СВОДНАЯ СТАТИСТИКА")
+    print("=" * 60)
+
+    print(report.summary_stats.to_string(index=False))
+
+
+def render_eda_report(report, output_dir='eda_report'):
+    """
+    Сохраняет графики отчета в PNG и сводную HTML-страницу, не открывая окон
+    """
+    plt.switch_backend('Agg')
+    plt.style.use('seaborn-v0_8-darkgrid')
+    sns.set_palette("husl")
+    os.makedirs(output_dir, exist_ok=True)
+    images = []
 
+    def save_figure(fig, name):
+        fig.tight_layout()
+        fig.savefig(os.path.join(output_dir, name), dpi=100)
+        plt.close(fig)
+        images.append(name)
+
+    # ДИНАМИКА ПРОДАЖ ПО МЕСЯЦАМ
+    monthly_stats = report.monthly_stats
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
 
     # График 1: Продажи в USD по месяцам
@@ -69,332 +369,167 @@ def eda(df):
     axes[1, 0].grid(True, alpha=0.3)
 
     # График 4: Распределение типов топлива
-    fuel_dist = df['fuel_type'].value_counts()
+    fuel_dist = report.fuel_dist
     axes[1, 1].pie(fuel_dist.values, labels=fuel_dist.index, autopct='%1.1f%%', startangle=90)
     axes[1, 1].set_title('Распределение по типу топлива', fontsize=14)
+    save_figure(fig, 'monthly_sales.png')
 
-    plt.tight_layout()
-    plt.show()
-
-    # ТОП-10 МАРОК ПО ПРОДАЖАМ
-    print("\n" + "=" * 60)
-    print("3. ТОП-10 МАРОК ПО ПРОДАЖАМ")
-    print("=" * 60)
-
-    top_brands_sales = df.groupby('brand').agg({
-        'sale_USD': 'sum',
-        'quantity': 'sum',
-        'price_USD': 'mean'
-    }).sort_values('sale_USD', ascending=False).head(10)
-
-    print("Топ-10 марок по объему продаж:")
-    print(top_brands_sales)
-
+    # ТОП-10 МАРОК
     fig, axes = plt.subplots(1, 2, figsize=(16, 6))
 
     # Топ брендов по сумме продаж
+    top_brands_sales = report.top_brands_sales
     axes[0].barh(top_brands_sales.index, top_brands_sales['sale_USD'] / 1e6, color='steelblue')
     axes[0].set_title('Топ-10 марок по объему продаж (млн USD)', fontsize=14)
     axes[0].set_xlabel('Сумма продаж, млн USD')
     axes[0].invert_yaxis()
 
     # Топ брендов по количеству
-    top_brands_qty = df.groupby('brand')['quantity'].sum().sort_values(ascending=False).head(10)
+    top_brands_qty = report.top_brands_qty
     axes[1].barh(top_brands_qty.index, top_brands_qty.values, color='lightcoral')
     axes[1].set_title('Топ-10 марок по количеству продаж', fontsize=14)
     axes[1].set_xlabel('Количество автомобилей')
     axes[1].invert_yaxis()
+    save_figure(fig, 'top_brands.png')
 
-    plt.tight_layout()
-    plt.show()
-
-    # АНАЛИЗ «МЕРКУР АВТО»
-    print("\n" + "=" * 60)
-    print("АНАЛИЗ ПОЗИЦИИ «МЕРКУР АВТО»")
-    print("=" * 60)
-
-    merkur_data = df[df['dealer_name'] == 'Mercur Auto']
-
-    if len(merkur_data) > 0:
-        merkur_sales_usd = merkur_data['sale_USD'].sum()
-        merkur_quantity = merkur_data['quantity'].sum()
-        merkur_avg_price = merkur_data['price_USD'].mean()
-        merkur_share_usd = (merkur_sales_usd / total_sales_usd) * 100
-        merkur_share_qty = (merkur_quantity / total_quantity) * 100
-
-        print(f"«Меркур Авто» - ключевые показатели:")
-        print(f"- Объем продаж: ${merkur_sales_usd:,.0f}")
-        print(f"- Количество проданных авто: {merkur_quantity}")
-        print(f"- Средняя цена: ${merkur_avg_price:,.0f}")
-        print(f"- Доля рынка (в деньгах): {merkur_share_usd:.2f}%")
-        print(f"- Доля рынка (в штуках): {merkur_share_qty:.2f}%")
-
-        # Сравнение с общим рынком
-        comparison = pd.DataFrame({
-            'Показатель': ['Средняя цена', 'Средняя сумма сделки', 'Средний объем двигателя'],
-            'Меркур Авто': [
-                merkur_avg_price,
-                merkur_data['sale_USD'].mean(),
-                merkur_data['engine_volume'].mean()
-            ],
-            'Весь рынок': [
-                df['price_USD'].mean(),
-                df['sale_USD'].mean(),
-                df['engine_volume'].mean()
-            ]
-        })
-
-        print("\nСравнение с общим рынком:")
-        print(comparison)
-
-        # Топ-5 марок у «Меркур Авто»
-        merkur_top_brands = merkur_data.groupby('brand').agg({
-            'sale_USD': 'sum',
-            'quantity': 'sum'
-        }).sort_values('sale_USD', ascending=False).head(5)
-
-        print("\nТоп-5 марок у «Меркур Авто»:")
-        print(merkur_top_brands)
-
-        # Визуализация позиции «Меркур Авто»
+    # Визуализация позиции дилера
+    if report.dealer_summary is not None:
+        summary = report.dealer_summary
         fig, axes = plt.subplots(2, 2, figsize=(14, 10))
 
         # Доля на рынке
-        market_share = [merkur_share_usd, 100 - merkur_share_usd]
-        axes[0, 0].pie(market_share, labels=['Меркур Авто', 'Остальные'], autopct='%1.1f%%', colors=['gold', 'lightblue'])
-        axes[0, 0].set_title('Доля «Меркур Авто» на рынке (в деньгах)', fontsize=14)
-
-        # Топ бренды «Меркур Авто»
-        axes[0, 1].bar(merkur_top_brands.index, merkur_top_brands['sale_USD'] / 1e6, color='orange')
-        axes[0, 1].set_title('Топ-5 марок «Меркур Авто» (млн USD)', fontsize=14)
+        market_share = [summary['share_usd'], 100 - summary['share_usd']]
+        axes[0, 0].pie(market_share, labels=[summary['dealer'], 'Остальные'], autopct='%1.1f%%', colors=['gold', 'lightblue'])
+        axes[0, 0].set_title(f"Доля «{summary['dealer']}» на рынке (в деньгах)", fontsize=14)
+
+        # Топ бренды дилера
+        dealer_top_brands = report.dealer_top_brands
+        axes[0, 1].bar(dealer_top_brands.index, dealer_top_brands['sale_USD'] / 1e6, color='orange')
+        axes[0, 1].set_title(f"Топ-5 марок «{summary['dealer']}» (млн USD)", fontsize=14)
         axes[0, 1].set_ylabel('Сумма продаж, млн USD')
         axes[0, 1].tick_params(axis='x', rotation=45)
 
         # Сравнение средней цены
-        price_comparison = [merkur_avg_price, df['price_USD'].mean()]
-        axes[1, 0].bar(['Меркур Авто', 'Весь рынок'], price_comparison, color=['gold', 'steelblue'])
+        price_comparison = [summary['avg_price'], report.overview['avg_price']]
+        axes[1, 0].bar([summary['dealer'], 'Весь рынок'], price_comparison, color=['gold', 'steelblue'])
         axes[1, 0].set_title('Сравнение средней цены', fontsize=14)
         axes[1, 0].set_ylabel('Средняя цена, USD')
         for i, v in enumerate(price_comparison):
             axes[1, 0].text(i, v + 1000, f'${v:,.0f}', ha='center', fontsize=10)
 
         # Распределение по сегментам
-        if 'segment_2013' in merkur_data.columns:
-            merkur_segments = merkur_data['segment_2013'].value_counts()
-            axes[1, 1].pie(merkur_segments.values, labels=merkur_segments.index, autopct='%1.1f%%')
-            axes[1, 1].set_title('Распределение продаж «Меркур Авто» по сегментам', fontsize=14)
-
-        plt.tight_layout()
-        plt.show()
-
-    else:
-        print("Данные по «Меркур Авто» не найдены в датасете")
+        if report.dealer_segments is not None:
+            dealer_segments = report.dealer_segments
+            axes[1, 1].pie(dealer_segments.values, labels=dealer_segments.index, autopct='%1.1f%%')
+            axes[1, 1].set_title(f"Распределение продаж «{summary['dealer']}» по сегментам", fontsize=14)
+        save_figure(fig, 'dealer_position.png')
 
     # ГЕОГРАФИЧЕСКИЙ АНАЛИЗ
-    print("\n" + "=" * 60)
-    print("ГЕОГРАФИЧЕСКИЙ АНАЛИЗ")
-    print("=" * 60)
-
-    if 'region' in df.columns:
-        region_stats = df.groupby('region').agg({
-            'sale_USD': 'sum',
-            'quantity': 'sum',
-            'price_USD': 'mean',
-            'dealer_name': 'nunique'
-        }).sort_values('sale_USD', ascending=False).head(10)
-
-        print("Топ-10 регионов по объему продаж:")
-        print(region_stats)
-
+    if report.region_stats is not None:
         fig, axes = plt.subplots(1, 2, figsize=(16, 6))
 
         # Продажи по регионам
+        region_stats = report.region_stats
         axes[0].barh(region_stats.index, region_stats['sale_USD'] / 1e6, color='teal')
         axes[0].set_title('Топ-10 регионов по объему продаж (млн USD)', fontsize=14)
         axes[0].set_xlabel('Сумма продаж, млн USD')
         axes[0].invert_yaxis()
 
         # Средняя цена по регионам
-        top_regions_price = region_stats.sort_values('price_USD', ascending=False).head(10)
+        top_regions_price = report.top_regions_price
         axes[1].barh(top_regions_price.index, top_regions_price['price_USD'], color='salmon')
         axes[1].set_title('Топ-10 регионов по средней цене', fontsize=14)
         axes[1].set_xlabel('Средняя цена, USD')
         axes[1].invert_yaxis()
-
-        plt.tight_layout()
-        plt.show()
+        save_figure(fig, 'regions.png')
 
     # АНАЛИЗ ТЕХНИЧЕСКИХ ХАРАКТЕРИСТИК
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
 
     # Распределение коробок передач
-    if 'transmission_box' in df.columns:
-        transmission_dist = df['transmission_box'].value_counts()
+    if report.transmission_dist is not None:
+        transmission_dist = report.transmission_dist
         axes[0, 0].bar(transmission_dist.index, transmission_dist.values, color='lightgreen')
         axes[0, 0].set_title('Распределение по типу КПП', fontsize=14)
         axes[0, 0].set_ylabel('Количество')
         axes[0, 0].tick_params(axis='x', rotation=45)
 
     # Распределение приводов
-    if 'drive_type' in df.columns:
-        drive_dist = df['drive_type'].value_counts()
+    if report.drive_dist is not None:
+        drive_dist = report.drive_dist
         axes[0, 1].bar(drive_dist.index, drive_dist.values, color='lightcoral')
         axes[0, 1].set_title('Распределение по типу привода', fontsize=14)
         axes[0, 1].set_ylabel('Количество')
         axes[0, 1].tick_params(axis='x', rotation=45)
 
-    # Распределение объема двигателя
-    if 'engine_volume' in df.columns:
-        axes[1, 0].hist(df['engine_volume'].dropna(), bins=30, edgecolor='black', alpha=0.7)
+    # Распределение объема двигателя (гистограмма по количеству каждого значения)
+    if report.engine_volume_counts is not None:
+        engine_counts = report.engine_volume_counts
+        axes[1, 0].hist(engine_counts.index, weights=engine_counts.values, bins=30, edgecolor='black', alpha=0.7)
         axes[1, 0].set_title('Распределение объема двигателя', fontsize=14)
         axes[1, 0].set_xlabel('Объем двигателя, л')
         axes[1, 0].set_ylabel('Количество')
 
     # Распределение возраста автомобилей
-    axes[1, 1].hist(df['car_age'].dropna(), bins=30, edgecolor='black', alpha=0.7, color='purple')
+    age_counts = report.car_age_counts
+    axes[1, 1].hist(age_counts.index.astype(float), weights=age_counts.values, bins=30,
+                    edgecolor='black', alpha=0.7, color='purple')
     axes[1, 1].set_title('Распределение возраста автомобилей', fontsize=14)
     axes[1, 1].set_xlabel('Возраст, лет')
     axes[1, 1].set_ylabel('Количество')
-
-    plt.tight_layout()
-    plt.show()
+    save_figure(fig, 'technical.png')
 
     # КОРРЕЛЯЦИОННЫЙ АНАЛИЗ
-    print("\n" + "=" * 60)
-    print("КОРРЕЛЯЦИОННЫЙ АНАЛИЗ")
-    print("=" * 60)
-
-    # Выбираем числовые колонки для корреляции
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    if len(numeric_cols) > 1:
-        correlation = df[numeric_cols].corr()
-
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(correlation, annot=True, cmap='coolwarm', center=0, fmt='.2f', linewidths=1)
+    if report.correlation is not None:
+        fig = plt.figure(figsize=(10, 8))
+        sns.heatmap(report.correlation, annot=True, cmap='coolwarm', center=0, fmt='.2f', linewidths=1)
         plt.title('Матрица корреляций', fontsize=16)
-        plt.tight_layout()
-        plt.show()
-
-        # Наиболее значимые корреляции
-        print("Наиболее значимые корреляции:")
-        corr_pairs = correlation.unstack().sort_values(ascending=False)
-        unique_pairs = pd.DataFrame(corr_pairs).reset_index()
-        unique_pairs = unique_pairs[unique_pairs['level_0'] != unique_pairs['level_1']]
-        print(unique_pairs.head(10))
-
-    # ТОП-10 МОДЕЛЕЙ ПО ПРОДАЖАМ
-    print("\n" + "=" * 60)
-    print("ТОП-10 МОДЕЛЕЙ ПО ПРОДАЖАМ")
-    print("=" * 60)
-
-    top_models = df.groupby(['brand', 'model']).agg({
-        'sale_USD': 'sum',
-        'quantity': 'sum',
-        'price_USD': 'mean'
-    }).sort_values('sale_USD', ascending=False).head(10)
-
-    print("Топ-10 моделей по объему продаж:")
-    print(top_models)
-
-    # СЕГМЕНТАЦИЯ И КЛАССЫ
-    print("\n" + "=" * 60)
-    print("АНАЛИЗ ПО СЕГМЕНТАМ И КЛАССАМ")
-    print("=" * 60)
-
-    if 'segment_2013' in df.columns and 'class_2013' in df.columns:
-        # Анализ по сегментам
-        segment_stats = df.groupby('segment_2013').agg({
-            'sale_USD': ['sum', 'count'],
-            'price_USD': 'mean'
-        }).round(2)
-
-        print("Статистика по сегментам:")
-        print(segment_stats)
-
-        # Анализ по классам
-        class_stats = df.groupby('class_2013').agg({
-            'sale_USD': 'sum',
-            'quantity': 'sum'
-        }).sort_values('sale_USD', ascending=False).head(10)
-
-        print("\nТоп-10 классов по объему продаж:")
-        print(class_stats)
-
-    # АНАЛИЗ КОНКУРЕНТОВ
-    print("\n" + "=" * 60)
-    print("АНАЛИЗ КОНКУРЕНТОВ")
-    print("=" * 60)
-
-    top_dealers = df.groupby('dealer_name').agg({
-        'sale_USD': 'sum',
-        'quantity': 'sum',
-        'price_USD': 'mean',
-        'brand': 'nunique'
-    }).sort_values('sale_USD', ascending=False).head(10)
-
-    print("Топ-10 дилеров по объему продаж:")
-    print(top_dealers)
-
-    # Если «Меркур Авто» в топе, покажем его позицию
-    if 'Меркур Авто' in top_dealers.index:
-        merkur_rank = top_dealers.index.get_loc('Меркур Авто') + 1
-        print(f"\n«Меркур Авто» занимает {merkur_rank}-е место среди всех дилеров")
-
-    # ВЫЯВЛЕНИЕ ТОЧЕК РОСТА ДЛЯ «МЕРКУР АВТО»
-    print("\n" + "=" * 60)
-    print("ВЫЯВЛЕНИЕ ТОЧЕК РОСТА")
-    print("=" * 60)
-
-    if len(merkur_data) > 0:
-        # Какие популярные бренды отсутствуют у «Меркур Авто»?
-        all_brands = set(df['brand'].unique())
-        merkur_brands = set(merkur_data['brand'].unique())
-        missing_brands = all_brands - merkur_brands
-
-        # Топ отсутствующих брендов по продажам на рынке
-        missing_brands_sales = df[df['brand'].isin(missing_brands)].groupby('brand')['sale_USD'].sum()
-        top_missing = missing_brands_sales.sort_values(ascending=False).head(5)
-
-        print("Топ-5 популярных брендов, которых нет у «Меркур Авто»:")
-        print(top_missing)
-
-        # Регионы, где «Меркур Авто» слаб
-        if 'region' in df.columns:
-            all_regions = df.groupby('region')['sale_USD'].sum().sort_values(ascending=False)
-            merkur_regions = merkur_data.groupby('region')['sale_USD'].sum()
-
-            # Регионы с высокими продажами, но низким присутствием «Меркур Авто»
-            potential_regions = all_regions.head(10).index.difference(merkur_regions.index)
-            print(f"\nТоп-10 регионов, где «Меркур Авто» отсутствует: {list(potential_regions)}")
-
-    # СВОДНАЯ СТАТИСТИКА
-    print("\n" + "=" * 60)
-    print("СВОДНАЯ СТАТИСТИКА")
-    print("=" * 60)
-
-    summary_stats = pd.DataFrame({
-        'Показатель': [
-            'Общий объем продаж (USD)',
-            'Общее количество продаж',
-            'Средняя цена автомобиля',
-            'Количество уникальных дилеров',
-            'Количество уникальных марок',
-            'Самый популярный бренд',
-            'Самый дорогой бренд (средняя цена)',
-            'Самый продаваемый месяц',
-            'Средний возраст автомобиля'
-        ],
-        'Значение': [
-            f"${total_sales_usd:,.0f}",
-            f"{total_quantity:,}",
-            f"${avg_price:,.0f}",
-            df['dealer_name'].nunique(),
-            df['brand'].nunique(),
-            top_brands_sales.index[0] if len(top_brands_sales) > 0 else 'N/A',
-            df.groupby('brand')['price_USD'].mean().idxmax() if len(df) > 0 else 'N/A',
-            monthly_stats.loc[monthly_stats['sale_USD'].idxmax(), 'sale_month'] if len(monthly_stats) > 0 else 'N/A',
-            f"{df['car_age'].mean():.1f} лет"
-        ]
-    })
-
-    print(summary_stats.to_string(index=False))
\ No newline at end of file
+        save_figure(fig, 'correlation.png')
+
+    # Сводная HTML-страница с таблицами и графиками
+    tables = [
+        ('Сводная статистика', report.summary_stats.to_html(index=False)),
+        ('Топ-10 марок по объему продаж', report.top_brands_sales.to_html()),
+        ('Топ-10 моделей по объему продаж', report.top_models.to_html()),
+        ('Топ-10 дилеров по объему продаж', report.top_dealers.to_html())
+    ]
+    if report.region_stats is not None:
+        tables.append(('Топ-10 регионов по объему продаж', report.region_stats.to_html()))
+    html = ['<html><head><meta charset="utf-8"><title>EDA</title></head><body>']
+    for title, table in tables:
+        html.append(f'<h2>{title}</h2>{table}')
+    for image in images:
+        html.append(f'<img src="{image}">')
+    html.append('</body></html>')
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(html))
+    print(f"Отчет EDA сохранён в каталог: {output_dir}")
+
+
+def save_eda_report(report, path='eda_report.pkl'):
+    """
+    Сохраняет агрегаты отчета, чтобы перестраивать графики без пересчета
+    """
+    with open(path, 'wb') as f:
+        pickle.dump(report, f)
+
+
+def load_eda_report(path='eda_report.pkl'):
+    """
+    Загружает сохраненные агрегаты отчета
+    """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def eda(df, output_dir='eda_report', aggregates=None):
+    """
+    Считает отчет EDA, печатает таблицы и сохраняет графики в output_dir.
+    Уже посчитанные aggregates можно передать, чтобы не строить куб повторно
+    """
+    if aggregates is None:
+        aggregates = build_eda_aggregates(df)
+    report = report_from_aggregates(aggregates)
+    print_eda_report(report)
+    render_eda_report(report, output_dir)
+    return report
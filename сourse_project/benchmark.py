@@ -0,0 +1,365 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from transmission import classify_transmission_simple, classify_transmission_series
+from pipeline import *
+
+# Размеры синтетических файлов по умолчанию (строк); для больших замеров --sizes 1000000 10000000
+DEFAULT_SIZES = [10000, 100000]
+
+# Размер файла для проверки памяти (--check-memory): на меньших файлах пик определяют постоянные расходы
+MEMORY_CHECK_ROWS = 200000
+
+# Значения для синтетических данных в формате autokz2019.csv, вместе с «грязными» вариантами
+SYNTHETIC_MONTHS = list(create_month_mapping())
+SYNTHETIC_DEALERS = ['Mercur Auto', 'MERCUR AUTOS', 'меркур авто', 'ТОО «Mercur Auto»', 'Astana Motors',
+                     'ТОО Каспиан Моторс', 'сaspian motors', 'ММС Рус', 'Равон Моторс Казахстан',
+                     'Автокплитал', 'Hino Motors ', 'Allur Auto', 'Terra Motors', 'Toyota Motor Kazakhstan',
+                     'Бипэк Авто', 'Orbis Auto', None]
+SYNTHETIC_MODELS = [('Chevrolet', 'Niva'), ('Chevrolet', 'Cobalt'), ('Jaguar', 'XF'), ('Audi', 'A3'),
+                    ('Toyota', 'Camry'), ('Toyota', 'Land Cruiser 200'), ('Lada', 'Vesta'), ('Lada', 'Granta'),
+                    ('Hyundai', 'Tucson'), ('Hyundai', 'Accent'), ('Kia', 'Rio'), ('BMW', 'X5'),
+                    ('GAZ', 'Gazelle Next'), ('Ravon', 'Nexia R3'), ('Nissan', 'Qashqai')]
+SYNTHETIC_ENGINES = ['1,6', '1.6 L', '2,0 L', '2', '2,5', '1,4 l', '3.0', '4,6', '1,8 AT', '2.5л', '21,6', '20.6',
+                     '35', '125', '#Н/Д', 'н/д', 'MT', '0,4', '30 квт', '150 л.с.', None]
+SYNTHETIC_TRANSMISSIONS = ['АКП', 'МКП', 'AT', 'MT', 'CVT', '6AT', '5MT', 'DSG', 'A/T', 'M/T', 'механика',
+                           'Автомат', 'TIPTRONIC', 'робот', 'АМТ', '7 DCT', 'мех', 'MANUAL', '4х2', None]
+SYNTHETIC_FUELS = ['Бензин', 'бензин ', 'Дизель', 'diesel', 'Электро', 'Гибрид', 'hybrid', 'petrol', 'газ',
+                   '2', None]
+SYNTHETIC_DRIVES = ['Передний', 'передний (FF)', 'FWD', '2WD', 'Задний', 'RWD', 'Полный', '4WD', '4x4',
+                    'quattro', '4MOTION', '#Н/Д', '0', '4x2', None]
+SYNTHETIC_COUNTRIES = ['Германия', 'США', 'Республика Казахстан', 'Российская Федерация', 'Корея', 'Япония',
+                       'Китай', 'UK', 'Узбекистан', 'Турция']
+SYNTHETIC_REGIONS = [('Алматы', 'г.Алматы'), ('Нур-Султан', 'г.Нур-Султан'), ('Экспорт', 'Экспорт область'),
+                     ('Караганда', 'Карагандинская область'), ('Шымкент', 'Туркестанская область'),
+                     ('Костанай', 'костанайская область'), ('Актобе', 'Актюбинская область'),
+                     ('Усть-Каменогорск', 'Восточно-Казахстанская область')]
+SYNTHETIC_YEARS = ['2019', '2018', '2 017', '2016\xa0', '2020', '2019\\', 'н/д', '1890', None]
+SYNTHETIC_SEGMENTS = ['Легковые автомобили', 'Внедорожники', 'Коммерческие автомобили', 'Пикапы']
+SYNTHETIC_CLASSES = ['B класс', 'C класс', 'D класс', 'Полноразмерные SUV', 'Компактные SUV', 'LCV']
+
+
+def generate_autokz(n_rows, seed=0):
+    """
+    Генерирует сырые данные со столбцами autokz2019.csv: русские заголовки, объемы двигателя
+    вида '1,6 L'/'#Н/Д', названия дилеров на разных языках, коды коробок передач, названия месяцев.
+    Около 5% строк - повторы, чтобы удаление дубликатов тоже работало
+    """
+    rng = np.random.default_rng(seed)
+    unique_rows = n_rows - n_rows // 20
+
+    def pick(values):
+        return np.array(values, dtype=object)[rng.integers(0, len(values), unique_rows)]
+
+    models = rng.integers(0, len(SYNTHETIC_MODELS), unique_rows)
+    regions = rng.integers(0, len(SYNTHETIC_REGIONS), unique_rows)
+    quantity = rng.choice([1, 1, 1, 1, 2, 3, 5, np.nan], unique_rows)
+    price = np.round(rng.lognormal(10, 0.6, unique_rows), 2)
+    df = pd.DataFrame({
+        'Год': rng.choice([2018, 2019], unique_rows),
+        'Месяц': pick(SYNTHETIC_MONTHS),
+        'Компания': pick(SYNTHETIC_DEALERS),
+        'Бренд': np.array([brand for brand, model in SYNTHETIC_MODELS], dtype=object)[models],
+        'Модель': np.array([model for brand, model in SYNTHETIC_MODELS], dtype=object)[models],
+        'Модификация': 'base',
+        'Год выпуска': pick(SYNTHETIC_YEARS),
+        'Страна-производитель': pick(SYNTHETIC_COUNTRIES),
+        'Вид топлива': pick(SYNTHETIC_FUELS),
+        'Объём двиг, л,': pick(SYNTHETIC_ENGINES),
+        'Коробка передач': pick(SYNTHETIC_TRANSMISSIONS),
+        'Тип привода': pick(SYNTHETIC_DRIVES),
+        'Сегмент': 'Легковые',
+        'Регион': np.array([region for region, area in SYNTHETIC_REGIONS], dtype=object)[regions],
+        'Наименование дилерского центра': 'ДЦ',
+        'Тип клиента': pick(['Физ. лицо', 'Юр. лицо']),
+        'Форма расчета': pick(['Наличный', 'Безналичный', 'Кредит']),
+        'Количество': quantity,
+        'Цена, USD': price,
+        'Продажа, USD': np.round(price * np.nan_to_num(quantity, nan=1), 2),
+        'Область': np.array([area for region, area in SYNTHETIC_REGIONS], dtype=object)[regions],
+        'Сегментация 2013': pick(SYNTHETIC_SEGMENTS),
+        'Класс 2013': pick(SYNTHETIC_CLASSES),
+        'Локализация производства': pick(['Импорт', 'Локальное производство']),
+        'Сегментация Eng': 'Passenger cars'
+    })
+    repeats = df.iloc[rng.integers(0, unique_rows, n_rows - unique_rows)]
+    return pd.concat([df, repeats], ignore_index=True)
+
+
+def write_autokz(path, n_rows, seed=0, chunk_rows=1000000):
+    """
+    Пишет синтетический файл в формате autokz2019.csv (';', десятичная запятая) частями,
+    чтобы файлы на десятки миллионов строк не требовали держать все в памяти
+    """
+    written = 0
+    part = 0
+    while written < n_rows:
+        rows = min(chunk_rows, n_rows - written)
+        df = generate_autokz(rows, seed=seed + part)
+        df.to_csv(path, sep=';', decimal=',', index=False, mode='a' if part else 'w', header=not part)
+        written += rows
+        part += 1
+    return path
+
+
+def benchmark_pipeline(sizes=DEFAULT_SIZES, repeat=1, seed=0):
+    """
+    Замеряет каждую стадию очистки, построение агрегатов EDA и расчет отчета
+    на синтетических файлах заданных размеров. Из повторов берется лучшее время
+    """
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            path = write_autokz(os.path.join(tmp_dir, f'autokz_{n_rows}.csv'), n_rows, seed=seed)
+            for _ in range(repeat):
+                runner = StageRunner()
+                # Отчетные print стадий не нужны в замерах
+                with contextlib.redirect_stdout(io.StringIO()):
+                    df = runner.run(None, [
+                        ('read_source', lambda df: read_source(path)),
+                        ('drop_empty', lambda df: df.dropna(how='all'))
+                    ])
+                    df = clean_rows(df, runner)
+                    df = runner.run_stage('deduplicate', deduplicate, df)
+                    df = finalize_rows(df, runner=runner)
+                    aggregates = runner.run_stage('eda_aggregates', build_eda_aggregates, df)
+                    runner.run_stage('eda_report', report_from_aggregates, aggregates)
+                timings += [dict(timing, rows=n_rows) for timing in runner.timings]
+            print(f"Размер {n_rows}: готово")
+
+    timings = pd.DataFrame(timings)
+    best = timings.groupby(['rows', 'stage'], sort=False).min().reset_index()
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'results': best.to_dict(orient='records')
+    }
+
+
+def check_memory(n_rows=MEMORY_CHECK_ROWS, max_ratio=2.8, seed=0):
+    """
+    Проверка расхода памяти: пик выделенной памяти (tracemalloc) при очистке
+    не должен превышать max_ratio размеров исходного DataFrame
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_autokz(os.path.join(tmp_dir, 'autokz.csv'), n_rows, seed=seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = read_source(path).dropna(how='all')
+    input_memory = frame_memory(df)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        finalize_rows(deduplicate(clean_rows(df)))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ratio = peak / input_memory
+    print(f"Память: исходный DataFrame {input_memory / 2 ** 20:.1f} МБ, пик при очистке {peak / 2 ** 20:.1f} МБ "
+          f"({ratio:.2f}x, допустимо {max_ratio}x)")
+    return ratio <= max_ratio
+
+
+# Модули, от которых должен зависеть ключ кэша стадии: их изменение делает результат в кэше устаревшим
+EXPECTED_STAGE_FILES = {
+    'categories': ['unique_mapping.py', 'rule_engine.py', 'country_of_origin.py'],
+    'dealer_name': ['unique_mapping.py', 'dealer_name.py'],
+    'area_region': ['unique_mapping.py', 'region_area.py'],
+    'transmission': ['unique_mapping.py', 'rule_engine.py'],
+    'deduplicate': ['unique_mapping.py', 'year_of_release.py', 'deduplication.py']
+}
+
+
+def stage_keys(stages, root_key='source'):
+    """
+    Ключи кэша для цепочки стадий: {стадия: ключ}
+    """
+    keys = {}
+    key = root_key
+    for name, func in stages:
+        key = stage_key(key, name, func)
+        keys[name] = key
+    return keys
+
+
+def check_stage_cache(module='unique_mapping.py'):
+    """
+    Проверка ключей кэша стадий: стадии зависят от модулей из EXPECTED_STAGE_FILES (в том числе
+    через методы объектов и классов проекта), а изменение module меняет ключ стадии categories
+    """
+    import stage_cache
+
+    stages = [*ROW_STAGES, ('deduplicate', deduplicate)]
+    ok = True
+    for name, func in stages:
+        files = {os.path.basename(path) for path in stage_dependencies(func)[0]}
+        missing = [file_name for file_name in EXPECTED_STAGE_FILES.get(name, []) if file_name not in files]
+        if missing:
+            print(f"Ключ стадии {name} не зависит от {', '.join(missing)}")
+            ok = False
+
+    # Изменение модуля моделируется другим хэшем его файла
+    before = stage_keys(stages)
+    original_digest = stage_cache.file_digest
+    stage_cache.file_digest = lambda path, *args: (original_digest(path, *args)
+                                                   + ('*' if os.path.basename(path) == module else ''))
+    try:
+        after = stage_keys(stages)
+    finally:
+        stage_cache.file_digest = original_digest
+    if before['categories'] == after['categories']:
+        print(f"Изменение {module} не меняет ключ стадии categories")
+        ok = False
+    if ok:
+        print(f"Ключи кэша стадий учитывают используемые модули, изменение {module} меняет ключ categories")
+    return ok
+
+
+def save_benchmark_results(results, path='benchmark_results.json'):
+    """
+    Сохраняет результаты замеров в JSON
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, default=float)
+    print(f"Результаты замеров сохранены в файл: {path}")
+
+
+def load_benchmark_results(path='benchmark_results.json'):
+    """
+    Загружает сохраненные результаты замеров
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_with_baseline(results, baseline, threshold=1.1):
+    """
+    Сравнивает время стадий с базовым замером: ratio > threshold считается замедлением
+    """
+    current = pd.DataFrame(results['results'])[['rows', 'stage', 'seconds']]
+    previous = pd.DataFrame(baseline['results'])[['rows', 'stage', 'seconds']]
+    comparison = current.merge(previous, on=['rows', 'stage'], how='outer', suffixes=('', '_baseline'))
+    comparison['ratio'] = comparison['seconds'] / comparison['seconds_baseline']
+    comparison['status'] = np.select([comparison['ratio'] > threshold, comparison['ratio'] < 1 / threshold],
+                                     ['медленнее', 'быстрее'], default='')
+
+    print("Сравнение с базовым замером:")
+    print(comparison.round(4).to_string(index=False))
+    regressions = comparison[comparison['status'] == 'медленнее']
+    if len(regressions) > 0:
+        print(f"Замедлились стадии: {', '.join(regressions['stage'].unique())}")
+    return comparison
+
+
+def benchmark_transmission(path='autokz2019.csv', repeat=5):
+    """
+    Замеряет скорость классификации коробок передач на исходных значениях из autokz2019.csv
+    """
+    raw = pd.read_csv(path, sep=';', usecols=['Коробка передач'])['Коробка передач']
+    unique_values = raw.drop_duplicates().tolist()
+
+    per_value = min(timeit.repeat(lambda: [classify_transmission_simple(value) for value in unique_values],
+                                  number=1, repeat=repeat))
+    per_column = min(timeit.repeat(lambda: classify_transmission_series(raw), number=1, repeat=repeat))
+
+    results = {
+        'rows': len(raw),
+        'unique_values': len(unique_values),
+        'per_value_us': per_value / max(len(unique_values), 1) * 1e6,
+        'column_ms': per_column * 1e3,
+    }
+    print("Классификация коробок передач:")
+    print(f"  Строк: {results['rows']}, уникальных значений: {results['unique_values']}")
+    print(f"  Одно значение: {results['per_value_us']:.2f} мкс")
+    print(f"  Весь столбец: {results['column_ms']:.2f} мс")
+    return results
+
+
+def linear_partial_match(company_mapping, name_lower):
+    """
+    Исходный поиск частичного совпадения перебором ключей - эталон для сравнения
+    """
+    for key in company_mapping:
+        if key in name_lower:
+            return key
+    return None
+
+
+def benchmark_dealer_normalizer(alias_counts=(30, 1000, 5000), n_names=2000, seed=0):
+    """
+    Замеряет поиск частичных совпадений названий дилеров при разном числе псевдонимов:
+    автомат DealerNormalizer против перебора ключей. Результаты обоих способов должны совпадать
+    """
+    rng = np.random.default_rng(seed)
+    letters = list('abcdefghijklmnopqrstuvwxyzабвгдежзиклмнопрстуфхцчшэюя')
+
+    def random_word(length):
+        return ''.join(rng.choice(letters, length))
+
+    results = []
+    for n_aliases in alias_counts:
+        mapping = create_company_mapping()
+        while len(mapping) < n_aliases:
+            mapping[f'{random_word(6)} {random_word(5)}'] = f'Dealer {len(mapping)}'
+        aliases = list(mapping)
+        # Часть названий содержит псевдоним внутри, остальные не совпадают ни с одним
+        names = [f'тоо {aliases[rng.integers(len(aliases))]} {random_word(4)}' if rng.random() < 0.5
+                 else f'{random_word(8)} {random_word(7)} {random_word(5)}' for _ in range(n_names)]
+
+        normalizer = DealerNormalizer(mapping)
+        automaton = min(timeit.repeat(lambda: [normalizer.find_partial(name) for name in names],
+                                      number=1, repeat=3))
+        linear = min(timeit.repeat(lambda: [linear_partial_match(normalizer.company_mapping, name)
+                                            for name in names], number=1, repeat=3))
+        same = all(normalizer.find_partial(name) == linear_partial_match(normalizer.company_mapping, name)
+                   for name in names)
+        results.append({'aliases': n_aliases, 'automaton_ms': automaton * 1e3, 'linear_ms': linear * 1e3,
+                        'same': same})
+
+    results = pd.DataFrame(results)
+    print(f"Частичные совпадения названий дилеров ({n_names} названий):")
+    print(results.round(2).to_string(index=False))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замеры скорости стадий на синтетических данных')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None,
+                        help=f'размеры файлов в строках (по умолчанию {DEFAULT_SIZES}, для --check-memory - '
+                             f'{MEMORY_CHECK_ROWS})')
+    parser.add_argument('--repeat', type=int, default=1, help='число повторов каждого замера')
+    parser.add_argument('--output', default='benchmark_results.json', help='файл результатов')
+    parser.add_argument('--baseline', default=None, help='файл базового замера для сравнения')
+    parser.add_argument('--check-memory', action='store_true',
+                        help='проверить, что пик памяти при очистке не превышает допустимой доли от исходных данных')
+    parser.add_argument('--transmission', default=None,
+                        help='замерить только классификацию коробок передач на указанном файле')
+    parser.add_argument('--check-cache', action='store_true',
+                        help='проверить, что ключи кэша стадий меняются при изменении используемых модулей')
+    parser.add_argument('--dealers', action='store_true',
+                        help='замерить поиск частичных совпадений названий дилеров при разном числе псевдонимов')
+    args = parser.parse_args()
+
+    if args.transmission:
+        benchmark_transmission(args.transmission)
+    elif args.check_cache:
+        sys.exit(0 if check_stage_cache() else 1)
+    elif args.dealers:
+        sys.exit(0 if benchmark_dealer_normalizer()['same'].all() else 1)
+    elif args.check_memory:
+        sys.exit(0 if check_memory(args.sizes[-1] if args.sizes else MEMORY_CHECK_ROWS) else 1)
+    else:
+        results = benchmark_pipeline(args.sizes or DEFAULT_SIZES, repeat=args.repeat)
+        save_benchmark_results(results, args.output)
+        if args.baseline:
+            compare_with_baseline(results, load_benchmark_results(args.baseline))
@@ -1,26 +1,126 @@
+import json
+import os
+import pandas as pd
+from unique_mapping import map_unique
+
+# Таблица ISO 3166 alpha-3: код -> названия страны (русские, английские, сокращения)
+COUNTRIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'countries.json')
+
+# Код для пропусков и стран, которых нет в таблице
+UNKNOWN_COUNTRY = 'UNK'
+
+# Файл со странами, не найденными в таблице
+COUNTRY_QUARANTINE_FILE = 'country_quarantine.csv'
+
+
+def load_country_codes(path=COUNTRIES_FILE):
+    """
+    Загружает таблицу стран и возвращает словарь: название в нижнем регистре -> ALPHA-3 код.
+    Сами коды тоже считаются названиями
+    """
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f)
+    codes = {}
+    for code, names in table.items():
+        for name in [code] + names:
+            codes[name.strip().lower()] = code
+    return codes
+
+
+# Таблица загружается один раз при импорте
+COUNTRY_CODES = load_country_codes()
+
+
 def country_to_alpha3(country_name):
     """
-    Преобразует название страны в ALPHA-3 код
-    """
-    country_mapping = {
-        'Германия': 'DEU',
-        'США': 'USA',
-        'Австрия': 'AUT',
-        'Республика Казахстан': 'KAZ',
-        'Российская Федерация': 'RUS',
-        'Корея': 'KOR',
-        'Япония': 'JPN',
-        'Таиланд': 'THA',
-        'Китай': 'CHN',
-        'UK': 'GBR',
-        'Узбекистан': 'UZB',
-        'Венгрия': 'HUN',
-        'Турция': 'TUR',
-        'Испания': 'ESP',
-        'Нидерланды': 'NLD',
-        'Польша': 'POL',
-        'Швеция': 'SWE',
-        'Белоруссия': 'BLR',
-        'Бельгия': 'BEL'
-    }
-    return country_mapping[country_name]
\ No newline at end of file
+    Преобразует название страны в ALPHA-3 код. Пропуск и неизвестная страна дают UNKNOWN_COUNTRY
+    """
+    return DEFAULT_COUNTRY_MAPPER.code(country_name)
+
+
+class CountryMapper:
+    """
+    Перевод столбца стран в ALPHA-3 коды. Неизвестные страны получают UNKNOWN_COUNTRY
+    и накапливаются в unknown (название -> число строк) для отчета
+    """
+
+    def __init__(self, country_codes=None):
+        self.country_codes = COUNTRY_CODES if country_codes is None else country_codes
+        self.unknown = {}
+
+    def __getstate__(self):
+        # Передается только таблица: накопленные неизвестные значения относятся к процессу
+        return self.country_codes
+
+    def __setstate__(self, country_codes):
+        self.__init__(country_codes)
+
+    def code(self, country_name):
+        """
+        ALPHA-3 код по таблице объекта или UNKNOWN_COUNTRY
+        """
+        if not isinstance(country_name, str):
+            return UNKNOWN_COUNTRY
+        return self.country_codes.get(country_name.strip().lower(), UNKNOWN_COUNTRY)
+
+    def apply(self, series):
+        """
+        Категориальный столбец кодов: таблица применяется к уникальным значениям,
+        строки получают код по кодам категорий. Неизвестные страны учитываются в unknown
+        """
+        alpha3 = map_unique(series, self.code, na_value=UNKNOWN_COUNTRY, categorical=True)
+        unknown = (alpha3 == UNKNOWN_COUNTRY) & series.notna()
+        if unknown.any():
+            for name, count in series[unknown].value_counts().items():
+                if count:
+                    self.unknown[name] = self.unknown.get(name, 0) + int(count)
+        return alpha3
+
+    def count_values(self, values, counts):
+        """
+        Учитывает неизвестные страны среди уже подсчитанных значений: values - уникальные
+        значения столбца, counts - число строк с каждым из них
+        """
+        for name, count in zip(values, counts):
+            if isinstance(name, str) and self.code(name) == UNKNOWN_COUNTRY and count:
+                self.unknown[name] = self.unknown.get(name, 0) + int(count)
+
+    def counts(self, reset=False):
+        """
+        Копия накопленных неизвестных стран; с reset=True они очищаются
+        """
+        unknown = dict(self.unknown)
+        if reset:
+            self.unknown = {}
+        return unknown
+
+    def add_counts(self, unknown):
+        """
+        Добавляет неизвестные страны, накопленные в другом процессе или сохраненные в кэше
+        """
+        for name, count in unknown.items():
+            self.unknown[name] = self.unknown.get(name, 0) + count
+
+    def report(self, path=COUNTRY_QUARANTINE_FILE):
+        """
+        Печатает неизвестные страны и сохраняет их в карантинный файл
+        """
+        if not self.unknown:
+            return
+        quarantine = pd.Series(self.unknown, name='rows').rename_axis('country').sort_values(ascending=False)
+        print(f"Неизвестные страны ({len(quarantine)}, {quarantine.sum()} строк) заменены на {UNKNOWN_COUNTRY}: "
+              f"{', '.join(quarantine.index[:5])}")
+        if path is not None:
+            quarantine.reset_index().to_csv(path, index=False, encoding='utf-8-sig')
+            print(f"Список неизвестных стран сохранён в файл: {path}")
+
+
+DEFAULT_COUNTRY_MAPPER = CountryMapper()
+
+
+def country_series_to_alpha3(series, mapper=None):
+    """
+    Переводит столбец стран в ALPHA-3 коды (по умолчанию - общим DEFAULT_COUNTRY_MAPPER)
+    """
+    mapper = DEFAULT_COUNTRY_MAPPER if mapper is None else mapper
+    return mapper.apply(series)
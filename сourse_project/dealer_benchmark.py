@@ -0,0 +1,70 @@
+import pandas as pd
+from eda_cube import *
+
+
+def presence_matrix(cube, column):
+    """
+    Матрица дилер x значение column: True, если у дилера есть хотя бы одна продажа
+    """
+    rows = cube.groupby(['dealer_name', column], observed=True)['rows'].sum()
+    return rows.unstack(fill_value=0) > 0
+
+
+def first_missing(presence, ordered_columns, limit=None):
+    """
+    Для каждого дилера перечисляет первые limit значений из ordered_columns, которых у него нет
+    """
+    missing = ~presence.reindex(columns=ordered_columns, fill_value=False)
+    if limit is not None:
+        # Номер отсутствующего значения в порядке ordered_columns
+        missing = missing & (missing.cumsum(axis=1) <= limit)
+    stacked = missing.stack()
+    stacked = stacked[stacked]
+    names = pd.Series(stacked.index.get_level_values(1).astype(str), index=stacked.index.get_level_values(0))
+    return names.groupby(level=0, sort=False).agg(', '.join).reindex(presence.index, fill_value='')
+
+
+def benchmark_dealers(cube, top_brands=5, top_regions=10):
+    """
+    Показатели анализа «Меркур Авто» сразу для всех дилеров: доля рынка, средняя цена
+    относительно рынка, топ марок, популярные марки и регионы, где дилера нет.
+    Считается по кубу агрегатов, одна строка на дилера
+    """
+    totals = cube_totals(cube)
+    dealers = cube.groupby('dealer_name', observed=True)[CUBE_MEASURES].sum()
+
+    table = pd.DataFrame({
+        'sales_usd': dealers['sale_USD'],
+        'quantity': dealers['quantity'],
+        'share_usd': dealers['sale_USD'] / totals['sale_USD'] * 100,
+        'share_qty': dealers['quantity'] / totals['quantity'] * 100,
+        'avg_price': dealers['price_sum'] / dealers['price_count'],
+        'market_avg_price': totals['avg_price']
+    })
+    table['price_vs_market'] = table['avg_price'] / table['market_avg_price']
+
+    # Топ марок дилера по сумме продаж
+    dealer_brands = cube.groupby(['dealer_name', 'brand'], observed=True)['sale_USD'].sum().reset_index()
+    dealer_brands = dealer_brands.sort_values(['dealer_name', 'sale_USD'], ascending=[True, False], kind='stable')
+    dealer_brands['brand'] = dealer_brands['brand'].astype(str)
+    table['top_brands'] = dealer_brands.groupby('dealer_name', observed=True).head(top_brands) \
+        .groupby('dealer_name', observed=True)['brand'].agg(', '.join)
+
+    # Самые продаваемые на рынке марки, которых у дилера нет
+    market_brands = rollup(cube, 'brand')['sale_USD'].sort_values(ascending=False).index
+    table['missing_top_brands'] = first_missing(presence_matrix(cube, 'brand'), market_brands, top_brands)
+
+    # Топ регионов рынка, где у дилера нет продаж
+    if 'region' in cube.columns:
+        market_regions = rollup(cube, 'region')['sale_USD'].sort_values(ascending=False).head(top_regions).index
+        table['missing_top_regions'] = first_missing(presence_matrix(cube, 'region'), market_regions)
+
+    return table.sort_values('sales_usd', ascending=False).rename_axis('dealer_name').reset_index()
+
+
+def save_dealer_benchmark(table, path='dealer_benchmark.csv'):
+    """
+    Сохраняет таблицу сравнения дилеров
+    """
+    table.to_csv(path, index=False, encoding='utf-8-sig')
+    print(f"Сравнение дилеров сохранено в файл: {path}")
@@ -1,4 +1,6 @@
+from functools import lru_cache
 import pandas as pd
+from unique_mapping import map_unique
 
 def create_company_mapping():
     """
@@ -54,46 +56,143 @@ def create_company_mapping():
     return company_mapping
 
 
-def standardize_company_name(name):
+class DealerNormalizer:
     """
-    Приводит название компании к единому формату
+    Стандартизатор названий дилеров: mapping строится один раз,
+    сначала ищется точное совпадение, затем частичное через автомат Ахо-Корасик по всем ключам
     """
-    if pd.isna(name):
-        return name
-    original_name = str(name).strip()
-    name_lower = original_name.lower().strip()
-    company_mapping = create_company_mapping()
-    # Проверяем есть ли точное соответствие в mapping
-    if name_lower in company_mapping:
-        return company_mapping[name_lower]
-    # Проверяем частичные совпадения
-    for key, value in company_mapping.items():
-        if key in name_lower:
-            return value
-    # Если не нашли в mapping, возвращаем оригинал с нормальным регистром
-    return original_name
-
-
-def clean_company_names(df):
+
+    def __init__(self, company_mapping=None, cache_size=100000):
+        if company_mapping is None:
+            company_mapping = create_company_mapping()
+        self.company_mapping = {str(key).lower(): value for key, value in company_mapping.items() if str(key)}
+        # Порядок ключей определяет приоритет при частичных совпадениях
+        self.keys = list(self.company_mapping)
+        self.build_automaton()
+        # Результат для названия кэшируется между чанками
+        self.match = lru_cache(maxsize=cache_size)(self.find_name)
+
+    def __getstate__(self):
+        # Передается только mapping: кэш относится к процессу
+        return self.company_mapping
+
+    def __setstate__(self, company_mapping):
+        self.__init__(company_mapping)
+
+    def build_automaton(self):
+        """
+        Строит автомат Ахо-Корасик: бор ключей с переходами по неудаче.
+        best[state] - наименьший номер ключа среди ключей, заканчивающихся в состоянии
+        (включая достижимые по ссылкам неудачи), или -1
+        """
+        self.goto = [{}]
+        self.best = [-1]
+        for i, key in enumerate(self.keys):
+            state = 0
+            for char in key:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.best.append(-1)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            if self.best[state] == -1:
+                self.best[state] = i
+
+        # Ссылки неудачи - обходом в ширину
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if state else 0
+                inherited = self.best[self.fail[child]]
+                if inherited != -1 and (self.best[child] == -1 or inherited < self.best[child]):
+                    self.best[child] = inherited
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Загружает mapping из CSV (столбцы alias, name) или YAML (alias: name)
+        """
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Для загрузки YAML нужен пакет PyYAML")
+            with open(path, encoding='utf-8') as f:
+                company_mapping = yaml.safe_load(f) or {}
+        else:
+            aliases = pd.read_csv(path, dtype=str, keep_default_na=False)
+            company_mapping = dict(zip(aliases['alias'], aliases['name']))
+        return cls(company_mapping)
+
+    def find_partial(self, name_lower):
+        """
+        Возвращает ключ, который первым встречается в mapping среди входящих в строку.
+        Строка просматривается один раз, время не зависит от числа ключей
+        """
+        goto, fail, best = self.goto, self.fail, self.best
+        state = 0
+        found = -1
+        for char in name_lower:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] != -1 and (found == -1 or best[state] < found):
+                found = best[state]
+                if found == 0:
+                    break
+        return None if found == -1 else self.keys[found]
+
+    def standardize(self, name):
+        """
+        Приводит название компании к единому формату
+        """
+        if pd.isna(name):
+            return name
+        return self.match(name)
+
+    def find_name(self, name):
+        """
+        Стандартное название для непустого значения (без кэша)
+        """
+        original_name = str(name).strip()
+        name_lower = original_name.lower().strip()
+        # Проверяем есть ли точное соответствие в mapping
+        if name_lower in self.company_mapping:
+            return self.company_mapping[name_lower]
+        # Проверяем частичные совпадения
+        key = self.find_partial(name_lower)
+        if key is not None:
+            return self.company_mapping[key]
+        # Если не нашли в mapping, возвращаем оригинал с нормальным регистром
+        return original_name
+
+    def standardize_series(self, series):
+        """
+        Стандартизирует столбец, обрабатывая каждое уникальное название один раз
+        """
+        return map_unique(series, self.standardize)
+
+
+DEFAULT_DEALER_NORMALIZER = DealerNormalizer()
+
+
+def standardize_company_name(name):
     """
-    Очищает и стандартизирует названия компаний
+    Приводит название компании к единому формату
     """
-    if 'dealer_name' not in df.columns:
-        return df
-    # Сохраняем оригинальные названия для анализа
-    df['dealer_name_original'] = df['dealer_name']
-    # Применяем стандартизацию
-    df['dealer_name_cleaned'] = df['dealer_name'].apply(standardize_company_name)
-
-    return df
+    return DEFAULT_DEALER_NORMALIZER.standardize(name)
 
 
-def final_company_cleaning(df):
+def clean_company_names(values, normalizer=None):
     """
-    Финальные преобразования для столбца компаний
+    Очищает и стандартизирует названия компаний, возвращает новый столбец.
+    normalizer - DealerNormalizer с собственным mapping (по умолчанию встроенный)
     """
-    # Заменяем оригинальный столбец очищенным
-    df['dealer_name'] = df['dealer_name_cleaned']
-    # Удаляем временные столбцы
-    df = df.drop(columns=['dealer_name_cleaned', 'dealer_name_original'])
-    return df
\ No newline at end of file
+    if normalizer is None:
+        normalizer = DEFAULT_DEALER_NORMALIZER
+    return normalizer.standardize_series(values)
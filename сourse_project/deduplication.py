@@ -0,0 +1,113 @@
+import os
+import numpy as np
+import pandas as pd
+from unique_mapping import map_unique
+from year_of_release import year_digits
+
+# Столбцы, по которым две строки считаются одной и той же продажей.
+# Страна, сегмент и класс определяются маркой и моделью, поэтому в ключ не входят
+DEDUP_KEY_COLUMNS = ['dealer_name', 'brand', 'model', 'year_of_release', 'engine_volume', 'fuel_type',
+                     'transmission_box', 'drive_type', 'region', 'area', 'quantity', 'price_USD', 'sale_USD',
+                     'sale_date']
+
+# Правила, по которым удаляются дубликаты
+DEDUP_RULES = {
+    'same_row': 'полное совпадение строк после нормализации',
+    'same_key': 'совпадение ключевых столбцов при различии остальных',
+    'seen': 'строка встречалась в предыдущих чанках или файлах'
+}
+
+
+def canonical_values(values, column=None):
+    """
+    Значения столбца в виде, который не зависит от типа, выбранного read_csv для чанка:
+    числа - float64, остальное - как есть (хэш категориального столбца считается по категориям
+    и кодам и совпадает с хэшем тех же строк в столбце object). У года выпуска остаются только цифры
+    """
+    if column == 'year_of_release':
+        # Пропуск дает пустую строку, как и значение без цифр
+        return map_unique(values, year_digits, na_value='', categorical=True)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype('float64')
+    return values
+
+
+def key_hashes(df, columns):
+    """
+    64-битные хэши строк по столбцам columns
+    """
+    canonical = pd.DataFrame({col: canonical_values(df[col], col) for col in columns}, index=df.index)
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+class Deduplicator:
+    """
+    Удаление дубликатов по хэшам ключевых столбцов после нормализации.
+    Хэши оставленных строк накапливаются в seen_hashes, поэтому один объект можно применять
+    к чанкам или файлам по очереди, а набор хэшей - сохранять между запусками
+    """
+
+    def __init__(self, key_columns=None, seen_hashes=None):
+        self.key_columns = key_columns or DEDUP_KEY_COLUMNS
+        self.seen_hashes = np.array([], dtype='uint64') if seen_hashes is None else seen_hashes
+        self.counts = dict.fromkeys(DEDUP_RULES, 0)
+
+    @classmethod
+    def load(cls, path, key_columns=None):
+        """
+        Загружает набор хэшей из файла .npy (если файла нет - пустой набор)
+        """
+        seen_hashes = np.load(path) if os.path.exists(path) else None
+        return cls(key_columns, seen_hashes)
+
+    def save(self, path):
+        """
+        Сохраняет набор хэшей в файл .npy
+        """
+        np.save(path, self.seen_hashes)
+
+    def drop(self, df):
+        """
+        Удаляет повторы внутри df (остается первая строка) и строки, встречавшиеся раньше
+        """
+        columns = [col for col in self.key_columns if col in df.columns]
+        hashes = key_hashes(df, columns)
+        repeated = pd.Series(hashes).duplicated().to_numpy()
+        seen = ~repeated & np.isin(hashes, self.seen_hashes)
+
+        if repeated.any():
+            # Правило для повтора: совпадают ли и остальные столбцы. Хэши остальных столбцов
+            # считаются только для строк из групп с одинаковым ключом
+            other_columns = [col for col in df.columns if col not in columns]
+            in_groups = pd.Series(hashes).duplicated(keep=False).to_numpy()
+            if other_columns:
+                pairs = pd.DataFrame({'key': hashes[in_groups],
+                                      'other': key_hashes(df[in_groups], other_columns)})
+                same_row = (pairs.duplicated().to_numpy() & repeated[in_groups]).sum()
+            else:
+                same_row = repeated.sum()
+            self.counts['same_row'] += int(same_row)
+            self.counts['same_key'] += int(repeated.sum() - same_row)
+        self.counts['seen'] += int(seen.sum())
+
+        keep = ~repeated & ~seen
+        self.seen_hashes = np.union1d(self.seen_hashes, hashes[keep])
+        return df[keep]
+
+    def report(self):
+        """
+        Печатает число удаленных дубликатов по правилам
+        """
+        print(f"Удалено дубликатов: {sum(self.counts.values())}")
+        for rule, description in DEDUP_RULES.items():
+            print(f"  {description}: {self.counts[rule]}")
+
+
+def deduplicate(df, key_columns=None):
+    """
+    Стадия удаления дубликатов для всего набора данных с отчетом по правилам
+    """
+    deduplicator = Deduplicator(key_columns)
+    df = deduplicator.drop(df)
+    deduplicator.report()
+    return df
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+# Измерения куба: все разрезы, по которым строятся таблицы отчета
+CUBE_KEYS = ['dealer_name', 'brand', 'model', 'region', 'sale_month', 'segment_2013', 'class_2013']
+
+# Аддитивные меры: суммы и количества, из которых получаются и суммы, и средние
+CUBE_MEASURES = ['sale_USD', 'sale_count', 'quantity', 'price_sum', 'price_count',
+                 'engine_sum', 'engine_count', 'rows']
+
+
+@dataclass
+class EdaAggregates:
+    """
+    Все, что нужно отчету EDA: куб по разрезам и распределения отдельных признаков
+    """
+    cube: pd.DataFrame
+    fuel_dist: pd.Series
+    transmission_dist: pd.Series
+    drive_dist: pd.Series
+    engine_volume_counts: pd.Series
+    car_age_counts: pd.Series
+    sale_date_min: pd.Timestamp
+    sale_date_max: pd.Timestamp
+    correlation_moments: dict = None
+
+
+def build_eda_cube(df):
+    """
+    Строит куб агрегатов за один проход группировки по всем измерениям CUBE_KEYS
+    """
+    keys = [col for col in CUBE_KEYS if col in df.columns and col != 'sale_month']
+    groups = [df[col] for col in keys] + [df['sale_date'].dt.month.rename('sale_month')]
+    cube = df.groupby(groups, observed=True, dropna=False).agg(
+        sale_USD=('sale_USD', 'sum'),
+        sale_count=('sale_USD', 'count'),
+        quantity=('quantity', 'sum'),
+        price_sum=('price_USD', 'sum'),
+        price_count=('price_USD', 'count'),
+        engine_sum=('engine_volume', 'sum'),
+        engine_count=('engine_volume', 'count'),
+        rows=('sale_USD', 'size')
+    )
+    return cube.reset_index()
+
+
+def rollup(cube, keys):
+    """
+    Сворачивает куб до заданных измерений: суммы продаж и количества, средняя цена
+    """
+    grouped = cube.groupby(keys, observed=True)[CUBE_MEASURES].sum()
+    return pd.DataFrame({
+        'sale_USD': grouped['sale_USD'],
+        'quantity': grouped['quantity'],
+        'price_USD': grouped['price_sum'] / grouped['price_count']
+    })
+
+
+def count_distinct(cube, keys, column):
+    """
+    Число различных значений column внутри каждой группы keys (по строкам куба)
+    """
+    return cube.groupby(keys, observed=True)[column].nunique()
+
+
+def cube_totals(cube):
+    """
+    Итоги по всему кубу
+    """
+    # Суммируем по столбцам отдельно, чтобы целые количества не превратились в float
+    totals = {measure: cube[measure].sum() for measure in CUBE_MEASURES}
+    return {
+        'sale_USD': totals['sale_USD'],
+        'quantity': totals['quantity'],
+        'avg_price': totals['price_sum'] / totals['price_count'] if totals['price_count'] else np.nan,
+        'avg_sale': totals['sale_USD'] / totals['sale_count'] if totals['sale_count'] else np.nan,
+        'avg_engine': totals['engine_sum'] / totals['engine_count'] if totals['engine_count'] else np.nan
+    }
+
+
+def correlation_moments(numeric):
+    """
+    Аддитивные суммы для попарных корреляций: для каждой пары столбцов число строк,
+    где оба значения есть, и суммы x, x^2, x*y по этим строкам
+    """
+    values = numeric.to_numpy(dtype='float64', na_value=np.nan)
+    valid = (~np.isnan(values)).astype('float64')
+    x = np.nan_to_num(values)
+    return {
+        'columns': list(numeric.columns),
+        'n': valid.T @ valid,
+        'sum_x': x.T @ valid,
+        'sum_xx': (x * x).T @ valid,
+        'sum_xy': x.T @ x
+    }
+
+
+def correlation_from_moments(moments):
+    """
+    Матрица корреляций Пирсона (по парно полным строкам, как DataFrame.corr) из накопленных сумм
+    """
+    n, sum_x, sum_xx, sum_xy = moments['n'], moments['sum_x'], moments['sum_xx'], moments['sum_xy']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = n * sum_xy - sum_x * sum_x.T
+        variance = (n * sum_xx - sum_x ** 2) * (n * sum_xx.T - sum_x.T ** 2)
+        correlation = covariance / np.sqrt(variance)
+    correlation = (correlation + correlation.T) / 2
+    diagonal = np.diag(correlation)
+    np.fill_diagonal(correlation, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return pd.DataFrame(correlation, index=moments['columns'], columns=moments['columns'])
+
+
+def add_counts(old, new):
+    """
+    Складывает два распределения value_counts
+    """
+    if old is None or new is None:
+        return new if old is None else old
+    return old.add(new, fill_value=0).astype('int64')
+
+
+def merge_eda_aggregates(old, new):
+    """
+    Объединяет агрегаты двух частей данных (например, истории и нового месяца)
+    """
+    if old is None:
+        return new
+    keys = [col for col in CUBE_KEYS if col in new.cube.columns]
+    cube = pd.concat([old.cube, new.cube], ignore_index=True) \
+        .groupby(keys, observed=True, dropna=False)[CUBE_MEASURES].sum().reset_index()
+
+    moments = new.correlation_moments
+    if old.correlation_moments is not None and moments is not None \
+            and old.correlation_moments['columns'] == moments['columns']:
+        moments = {key: (value if key == 'columns' else value + old.correlation_moments[key])
+                   for key, value in moments.items()}
+
+    return EdaAggregates(
+        cube=cube,
+        fuel_dist=add_counts(old.fuel_dist, new.fuel_dist).sort_values(ascending=False),
+        transmission_dist=add_counts(old.transmission_dist, new.transmission_dist).sort_values(ascending=False),
+        drive_dist=add_counts(old.drive_dist, new.drive_dist).sort_values(ascending=False),
+        engine_volume_counts=add_counts(old.engine_volume_counts, new.engine_volume_counts).sort_index(),
+        car_age_counts=add_counts(old.car_age_counts, new.car_age_counts).sort_index(),
+        sale_date_min=min(old.sale_date_min, new.sale_date_min),
+        sale_date_max=max(old.sale_date_max, new.sale_date_max),
+        correlation_moments=moments
+    )
+
+
+def car_ages(df):
+    """
+    Возраст автомобиля на момент продажи
+    """
+    return (df['sale_date'].dt.year.astype('Int16') - df['year_of_release']).rename('car_age')
+
+
+def build_eda_aggregates(df):
+    """
+    Считает куб и распределения признаков, по которым затем строится отчет EDA
+    """
+    sale_month = df['sale_date'].dt.month.rename('sale_month')
+    sale_quarter = df['sale_date'].dt.quarter.rename('sale_quarter')
+    car_age = car_ages(df)
+
+    # Корреляции считаются по строкам, с теми же признаками, что добавляет add_date_features
+    numeric = df.select_dtypes(include=[np.number])
+    for extra in [sale_month, sale_quarter, car_age]:
+        if extra.name not in numeric.columns:
+            numeric = numeric.assign(**{extra.name: extra})
+
+    return EdaAggregates(
+        cube=build_eda_cube(df),
+        fuel_dist=df['fuel_type'].value_counts(),
+        transmission_dist=df['transmission_box'].value_counts() if 'transmission_box' in df.columns else None,
+        drive_dist=df['drive_type'].value_counts() if 'drive_type' in df.columns else None,
+        engine_volume_counts=df['engine_volume'].value_counts().sort_index() if 'engine_volume' in df.columns else None,
+        car_age_counts=car_age.value_counts().sort_index(),
+        sale_date_min=df['sale_date'].min(),
+        sale_date_max=df['sale_date'].max(),
+        correlation_moments=correlation_moments(numeric) if len(numeric.columns) > 1 else None
+    )
@@ -1,10 +1,21 @@
 import pandas as pd
 import numpy as np
+import os
 import re
 
+# Образцы грязных значений объема двигателя с брендами и моделями для проверки check_engine_parity
+ENGINE_SAMPLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'engine_volume_samples.csv')
+
+# Мусорные значения объема двигателя (ищутся в нижнем регистре)
+GARBAGE_ENGINE_VALUES = ['mt', 'at', 'н/д', '#h/д', '#н/д', 'кип', 'л.с.', 'квт']
+GARBAGE_ENGINE_PATTERN = re.compile('|'.join(re.escape(value) for value in GARBAGE_ENGINE_VALUES))
+ENGINE_NUMBER_PATTERN = re.compile(r'(\d+\.?\d*)')
+
+
 def clean_engine_volume(value, brand=None, model=None):
     """
-    Очищает, исправляет и округляет объем двигателя до 1 знака после запятой
+    Очищает, исправляет и округляет объем двигателя до 1 знака после запятой.
+    Построчная эталонная версия для проверки clean_engine_volume_series
     """
     if pd.isna(value):
         return np.nan
@@ -16,8 +27,7 @@ def clean_engine_volume(value, brand=None, model=None):
     # Обработка мусорных значений
     lower_cleaned = cleaned.lower()
     # Мусорные значения
-    garbage_values = ['mt', 'at', 'н/д', '#h/д', '#н/д', 'кип', 'л.с.', 'квт']
-    if any(garbage in lower_cleaned for garbage in garbage_values):
+    if any(garbage in lower_cleaned for garbage in GARBAGE_ENGINE_VALUES):
         return np.nan
     # Извлекаем числовую часть
     numbers = re.findall(r'\d+\.?\d*', cleaned)
@@ -54,41 +64,151 @@ def clean_engine_volume(value, brand=None, model=None):
         return np.nan
 
 
-def apply_engine_cleaning(df):
+def round_unique(values, decimals=1):
+    """
+    Округляет массив так же, как встроенный round(), вычисляя его только для уникальных значений
+    """
+    values = np.asarray(values, dtype='float64')
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(float(value), decimals) for value in unique_values], dtype='float64')
+    return rounded[inverse.reshape(-1)]
+
+
+def clean_engine_volume_series(values, brands=None, models=None):
+    """
+    Векторная версия clean_engine_volume: очищает весь столбец за один проход
+    """
+    missing = values.isna().to_numpy()
+    # Те же шаги, что и в clean_engine_volume: запятые, литера L и пробелы
+    cleaned = (values.astype(str).str.strip()
+               .str.replace(',', '.', regex=False)
+               .str.replace(r'[Ll ]', '', regex=True))
+    garbage = cleaned.str.lower().str.contains(GARBAGE_ENGINE_PATTERN).to_numpy(dtype=bool)
+    # Числовая часть - первое найденное число
+    numeric = pd.to_numeric(cleaned.str.extract(ENGINE_NUMBER_PATTERN, expand=False),
+                            errors='coerce').to_numpy(dtype='float64')
+    numeric = np.where(missing | garbage, np.nan, numeric)
+
+    # Если значение > 50 - скорее всего перепутаны объем и мощность
+    swapped = numeric > 50
+    divided = numeric / 10
+    in_range = (numeric >= 0.5) & (numeric <= 8.0)
+    divided_in_range = (divided >= 0.5) & (divided <= 8.0)
+
+    # Особые случаи для конкретных моделей
+    special = np.zeros(len(values), dtype=bool)
+    if brands is not None and models is not None:
+        brand_lower = brands.astype(str).str.lower()
+        model_lower = models.astype(str).str.lower()
+        # Как `if brand and model` в clean_engine_volume: None и '' - ложь, NaN - истина
+        has_brand_model = (brands.to_numpy(dtype=object).astype(bool)
+                           & models.to_numpy(dtype=object).astype(bool))
+        niva = (brand_lower.str.contains('chevrolet', regex=False)
+                & model_lower.str.contains('niva', regex=False)).to_numpy()
+        jaguar = brand_lower.str.contains('jaguar', regex=False).to_numpy()
+        special = has_brand_model & (niva | jaguar) & (numeric > 10) & ~swapped
+
+    result = np.where(swapped, np.where(divided_in_range, divided, np.nan),
+                      np.where(special, divided, np.where(in_range, numeric, np.nan)))
+    return pd.Series(round_unique(result), index=values.index, dtype='float64')
+
+
+def compute_brand_medians(df):
+    """
+    Считает медиану объема двигателя по каждому бренду
+    """
+    return df.groupby('brand', observed=True)['engine_volume'].median().round(1)
+
+
+def count_engine_volumes(df, counts=None, column='engine_volume'):
+    """
+    Накапливает количество каждого значения объема двигателя по брендам.
+    Этого компактного состояния достаточно, чтобы посчитать точные медианы по частям данных
+    """
+    chunk_counts = df.groupby(['brand', column], observed=True).size()
+    # Бренды - обычные строки, чтобы количества из разных частей и из сохраненного состояния складывались
+    chunk_counts.index = pd.MultiIndex.from_arrays(
+        [chunk_counts.index.get_level_values(0).astype(str), chunk_counts.index.get_level_values(1)],
+        names=['brand', 'engine_volume'])
+    if counts is None:
+        return chunk_counts
+    return counts.add(chunk_counts, fill_value=0)
+
+
+def brand_medians_from_counts(counts):
     """
-    Применяет очистку объема двигателя
+    Считает медиану объема двигателя по брендам из накопленных количеств
     """
-    df['engine_volume_original'] = df['engine_volume']
-    df['engine_volume_cleaned'] = df.apply(
-        lambda row: clean_engine_volume(row['engine_volume'], row.get('brand'), row.get('model')),
-        axis=1
-    )
-    return df
+    medians = {}
+    for brand, brand_counts in counts.groupby(level=0):
+        brand_counts = brand_counts.droplevel(0).sort_index()
+        values = brand_counts.index.to_numpy(dtype='float64')
+        cumulative = brand_counts.to_numpy().cumsum()
+        total = cumulative[-1]
+        # Два средних элемента отсортированной выборки (для нечетного размера совпадают)
+        lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+        upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+        medians[brand] = (lower + upper) / 2
+    return pd.Series(medians, dtype='float64').rename_axis('brand').round(1)
 
 
-def final_engine_cleaning(df):
+def final_engine_cleaning(df, brand_medians=None):
     """
-    Финальные преобразования для объема двигателя с округлением
+    Заполняет пропуски объема двигателя медианой по бренду и возвращает новый столбец.
+    brand_medians - медианы по брендам, накопленные по истории или по всем чанкам
+    (для брендов, которых в них нет, считаются по df)
     """
-    # Заменяем оригинальный столбец очищенным
-    df['engine_volume'] = df['engine_volume_cleaned']
-    # Удаляем временные столбцы
-    df = df.drop(columns=['engine_volume_cleaned', 'engine_volume_original'])
     # Дополнительное округление на всякий случай
-    df['engine_volume'] = df['engine_volume'].round(1)
-    # Заполняем пропуски медианой по бренду
-    if 'brand' in df.columns:
-        brand_medians = df.groupby('brand')['engine_volume'].median().round(1)
-        def fill_with_brand_median(row):
-            if pd.isna(row['engine_volume']) and row['brand'] in brand_medians:
-                return brand_medians[row['brand']]
-            return row['engine_volume']
-
-        df['engine_volume'] = df.apply(fill_with_brand_median, axis=1)
-    # Проверяем что все значения округлены правильно
-    unique_decimals = set()
-    for val in df['engine_volume'].dropna():
-        decimal_part = val - int(val) if val != 0 else 0
-        if decimal_part > 0:
-            unique_decimals.add(round(decimal_part, 2))
-    return df
\ No newline at end of file
+    engine_volume = df['engine_volume'].round(1)
+    if 'brand' not in df.columns:
+        return engine_volume
+    current_medians = compute_brand_medians(df)
+    if brand_medians is not None:
+        current_medians = brand_medians.combine_first(current_medians)
+    return engine_volume.fillna(df['brand'].map(current_medians).astype('float64'))
+
+
+def read_engine_columns(path):
+    """
+    Объем двигателя, бренд и модель из файла: с заголовками engine_volume, brand, model
+    (образцы из data/, processed_data.csv) или из исходного файла в формате autokz2019.csv
+    """
+    header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    if 'engine_volume' in header:
+        return pd.read_csv(path, usecols=['engine_volume', 'brand', 'model'], dtype=str, encoding='utf-8-sig')
+    from load_data import read_source
+
+    return read_source(path).dropna(how='all')[['engine_volume', 'brand', 'model']]
+
+
+def check_engine_parity(path=ENGINE_SAMPLES_FILE):
+    """
+    Сравнивает векторную очистку объема двигателя с построчной эталонной clean_engine_volume.
+    Пропуски бренда и модели проверяются и как NaN (как после чтения CSV), и как None
+    """
+    df = read_engine_columns(path)
+    ok = True
+    for missing in [np.nan, None]:
+        brands = df['brand'].astype(object).where(df['brand'].notna(), missing)
+        models = df['model'].astype(object).where(df['model'].notna(), missing)
+        expected = pd.Series([clean_engine_volume(value, brand, model) for value, brand, model
+                              in zip(df['engine_volume'], brands, models)], index=df.index, dtype='float64')
+        actual = clean_engine_volume_series(df['engine_volume'], brands, models)
+
+        differ = ~((actual == expected) | (actual.isna() & expected.isna()))
+        if differ.any():
+            examples = pd.DataFrame({'engine_volume': df['engine_volume'], 'brand': brands, 'model': models,
+                                     'expected': expected, 'actual': actual})[differ]
+            print(f"Очистка объема двигателя различается в {differ.sum()} строках из {len(df)} "
+                  f"(пропуски - {missing}):")
+            print(examples.head(10).to_string())
+            ok = False
+    if ok:
+        print(f"Векторная и построчная очистка объема двигателя совпадают: {len(df)} строк, "
+              f"{expected.notna().sum()} значений ({os.path.basename(path)})")
+    return ok
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check_engine_parity(*sys.argv[1:2]) else 1)
@@ -1,34 +1,19 @@
-import pandas as pd
+from rule_engine import *
+
+# Правила вида топлива из data/normalization_rules.json
+FUEL_TYPE_RULES = NORMALIZATION_RULES['fuel_type']
+
 
 def encode_fuel_type(fuel_type):
     """
     Кодирует вид топлива в краткие категории:
-    F - бензин, D - дизель, E - электро, HYB - гибрид
+    F - бензин, D - дизель, E - электро, HYB - гибрид, UNK - не определен
     """
-    if pd.isna(fuel_type):
-        return 'UNK'
-
-    fuel_str = str(fuel_type).lower().strip()
-
-    # Бензин
-    if any(word in fuel_str for word in ['бензин', 'petrol', 'gasoline']):
-        return 'F'
-
-    # Дизель
-    elif any(word in fuel_str for word in ['дизель', 'diesel']):
-        return 'D'
+    return FUEL_TYPE_RULES(fuel_type)
 
-    # Электро
-    elif any(word in fuel_str for word in ['электро', 'электричество', 'electric']):
-        return 'E'
 
-    # Гибрид
-    elif any(word in fuel_str for word in ['гибрид', 'hybrid']):
-        return 'HYB'
-
-    # Числовые значения и мусор
-    elif fuel_str in ['2', '1,6', '0']:
-        return 'UNK'  # Неопределимый тип
-
-    else:
-        return 'UNK'
\ No newline at end of file
+def encode_fuel_type_series(series):
+    """
+    Кодирует столбец вида топлива с учетом в счетчиках правил
+    """
+    return FUEL_TYPE_RULES.apply(series)
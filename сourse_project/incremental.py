@@ -0,0 +1,104 @@
+import json
+import os
+import pickle
+import pandas as pd
+from pipeline import *
+
+# Файлы состояния в каталоге state_dir
+STATE_HASHES_FILE = 'key_hashes.npy'
+STATE_ENGINE_COUNTS_FILE = 'engine_counts.csv'
+STATE_DICTIONARIES_FILE = 'dictionaries.json'
+STATE_AGGREGATES_FILE = 'eda_aggregates.pkl'
+
+
+def load_state(state_dir='state'):
+    """
+    Загружает состояние предыдущих запусков. Если каталога нет, возвращает пустое состояние
+    """
+    state = {
+        'deduplicator': Deduplicator(),
+        'engine_counts': None,
+        'dictionaries': {},
+        'aggregates': None
+    }
+    state['deduplicator'] = Deduplicator.load(os.path.join(state_dir, STATE_HASHES_FILE))
+
+    path = os.path.join(state_dir, STATE_ENGINE_COUNTS_FILE)
+    if os.path.exists(path):
+        counts = pd.read_csv(path, encoding='utf-8-sig', dtype={'brand': 'str'})
+        state['engine_counts'] = counts.set_index(['brand', 'engine_volume'])['count']
+
+    path = os.path.join(state_dir, STATE_DICTIONARIES_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            state['dictionaries'] = json.load(f)
+
+    path = os.path.join(state_dir, STATE_AGGREGATES_FILE)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            state['aggregates'] = pickle.load(f)
+    return state
+
+
+def save_state(state, state_dir='state'):
+    """
+    Сохраняет состояние: хэши ключевых столбцов строк, количества объемов двигателя по брендам,
+    словари значений и агрегаты отчета EDA
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    state['deduplicator'].save(os.path.join(state_dir, STATE_HASHES_FILE))
+
+    if state['engine_counts'] is not None:
+        counts = state['engine_counts'].rename('count').rename_axis(['brand', 'engine_volume']).reset_index()
+        counts.to_csv(os.path.join(state_dir, STATE_ENGINE_COUNTS_FILE), index=False, encoding='utf-8-sig')
+
+    with open(os.path.join(state_dir, STATE_DICTIONARIES_FILE), 'w', encoding='utf-8') as f:
+        json.dump(state['dictionaries'], f, ensure_ascii=False, indent=2)
+
+    with open(os.path.join(state_dir, STATE_AGGREGATES_FILE), 'wb') as f:
+        pickle.dump(state['aggregates'], f)
+    print(f"Состояние сохранено в каталог: {state_dir}")
+
+
+def run_incremental(path='autokz2019.csv', output_filename=None, state_dir='state',
+                    file_format='csv', partition_by_date=False, engine=None, report=True, runner=None,
+                    workers=None):
+    """
+    Обрабатывает только новый файл (например, за очередной месяц), не перечитывая историю.
+    Строки, уже встречавшиеся раньше, отбрасываются после нормализации по сохраненным хэшам; медианы объема
+    двигателя считаются по накопленным количествам истории и новых строк; результат
+    дописывается к выходному набору, а агрегаты EDA объединяются с сохраненными.
+    Пропуски в уже сохраненных строках заполнены медианами на момент их обработки
+    """
+    if output_filename is None:
+        output_filename = f'processed_data.{file_format}'
+    state = load_state(state_dir)
+
+    df = read_source(path, engine=engine)
+    df = df.dropna(how='all')
+    rows_read = len(df)
+    df = clean_rows(df, runner, workers)
+    df = state['deduplicator'].drop(df)
+    state['deduplicator'].report()
+    report_normalization()
+    print(f"Новых строк: {len(df)} из {rows_read}")
+    if df.empty:
+        print("Новых данных нет, состояние не изменилось")
+        return
+
+    state['dictionaries'] = update_dictionaries(state['dictionaries'], df)
+    state['engine_counts'] = count_engine_volumes(df, state['engine_counts'])
+    brand_medians = brand_medians_from_counts(state['engine_counts'])
+    # Общие словари дают одинаковые категории во всех месяцах
+    df = finalize_rows(df, brand_medians=brand_medians, runner=runner, dictionaries=state['dictionaries'])
+    state['aggregates'] = merge_eda_aggregates(state['aggregates'], build_eda_aggregates(df))
+
+    df = add_date_features(df).drop(columns=['sale_month'])
+    save(df, output_filename, append=os.path.exists(output_filename),
+         file_format=file_format, partition_by_date=partition_by_date)
+    save_state(state, state_dir)
+
+    if report:
+        # Отчет строится по накопленным агрегатам, без чтения прошлых месяцев
+        eda(None, aggregates=state['aggregates'])
+        save_dealer_benchmark(benchmark_dealers(state['aggregates'].cube))
@@ -0,0 +1,105 @@
+import pandas as pd
+
+# Удаление ненужных столбцов (предполагаемые названия на русском)
+COLUMNS_TO_DROP = ['Форма расчета', 'Сегмент', 'Наименование дилерского центра',
+                   'Тип клиента', 'Модификация', 'Локализация производства', 'Сегментация Eng']
+
+# Переименование столбцов на английский
+COLUMN_MAPPING = {
+    'Год': 'year',
+    'Месяц': 'month',
+    'Компания': 'dealer_name',
+    'Бренд': 'brand',
+    'Модель': 'model',
+    'Год выпуска': 'year_of_release',
+    'Вид топлива': 'fuel_type',
+    'Объём двиг, л,': 'engine_volume',
+    'Коробка передач': 'transmission_box',
+    'Тип привода': 'drive_type',
+    'Сегментация 2013': 'segment_2013',
+    'Регион': 'region',
+    'Область': 'area',
+    'Количество': 'quantity',
+    'Цена, USD': 'price_USD',
+    'Продажа, USD': 'sale_USD',
+    'Класс 2013': 'class_2013',
+    'Страна-производитель': 'country_of_origin'
+}
+
+
+# Типы исходных столбцов: категории для повторяющихся значений, числа для количества и цен.
+# Свободный текст читается строками, чтобы тип не зависел от содержимого чанка
+SOURCE_DTYPES = {
+    'Месяц': 'category',
+    'Компания': 'str',
+    'Бренд': 'category',
+    'Модель': 'category',
+    'Год выпуска': 'str',
+    'Вид топлива': 'category',
+    'Объём двиг, л,': 'str',
+    'Коробка передач': 'category',
+    'Тип привода': 'category',
+    'Сегментация 2013': 'category',
+    'Регион': 'category',
+    'Область': 'category',
+    'Класс 2013': 'category',
+    'Страна-производитель': 'category',
+    'Количество': 'float64',
+    'Цена, USD': 'float64',
+    'Продажа, USD': 'float64'
+}
+
+NUMERIC_SOURCE_COLUMNS = [col for col, dtype in SOURCE_DTYPES.items() if dtype == 'float64']
+
+
+def parse_numbers(values):
+    """
+    Переводит строки вида '12 345,6' в числа (нужно для движка pyarrow, который не знает thousands)
+    """
+    values = values.astype(str).str.replace(r'[\s\xa0]', '', regex=True).str.replace(',', '.', regex=False)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def source_usecols(path):
+    """
+    Столбцы файла без удаляемых - читается только заголовок
+    """
+    header = pd.read_csv(path, sep=';', nrows=0).columns
+    return [col for col in header if col not in COLUMNS_TO_DROP]
+
+
+def prepare_columns(df):
+    """
+    Удаляет ненужные столбцы и переименовывает остальные на английский
+    """
+    df = df.drop(columns=[col for col in COLUMNS_TO_DROP if col in df.columns])
+    return df.rename(columns=COLUMN_MAPPING)
+
+
+def read_source(path='autokz2019.csv', chunksize=None, engine=None):
+    """
+    Загружает исходный файл целиком или, если задан chunksize, возвращает итератор по частям.
+    Удаляемые столбцы не читаются, остальные сразу получают типы из SOURCE_DTYPES.
+    engine='pyarrow' ускоряет разбор, но не поддерживает chunksize
+    """
+    usecols = source_usecols(path)
+    dtype = {col: col_type for col, col_type in SOURCE_DTYPES.items() if col in usecols}
+
+    if engine == 'pyarrow':
+        if chunksize is not None:
+            raise ValueError("Движок pyarrow не поддерживает чтение по частям")
+        # pyarrow не умеет разделитель тысяч, поэтому числа читаются строками и разбираются отдельно.
+        # Строки читаются как object: с dtype 'str' pyarrow превращает пропуски в строку 'None'
+        numeric = [col for col in NUMERIC_SOURCE_COLUMNS if col in usecols]
+        dtype.update({col: 'object' for col, col_type in dtype.items() if col_type == 'str'})
+        dtype.update({col: 'object' for col in numeric})
+        df = pd.read_csv(path, sep=';', decimal=',', usecols=usecols, dtype=dtype, engine='pyarrow')
+        for col in numeric:
+            df[col] = parse_numbers(df[col])
+        return prepare_columns(df)
+
+    reader = pd.read_csv(path, sep=';', decimal=',', thousands=' ', usecols=usecols, dtype=dtype,
+                         chunksize=chunksize, engine=engine)
+    if chunksize is None:
+        return prepare_columns(reader)
+    return (prepare_columns(chunk) for chunk in reader)
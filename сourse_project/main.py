@@ -1,84 +1,70 @@
-from sale_date import *
-from country_of_origin import *
-from fuel_type import *
-from dealer_name import *
-from engine_volume import *
-from region_area import *
-from transmission import *
-from type_conversions import *
-from quan_price_sale import *
-from drive_type import *
-from year_of_release  import *
-from EDA import *
-from save import *
-
-# Загрузка данных
-df = pd.read_csv('autokz2019.csv', sep=';', decimal=',', thousands=' ')
-
-# Удаление ненужных столбцов (предполагаемые названия на русском)
-columns_to_drop = ['Форма расчета', 'Сегмент', 'Наименование дилерского центра',
-                   'Тип клиента', 'Модификация', 'Локализация производства', 'Сегментация Eng']
-df = df.drop(columns=[col for col in columns_to_drop if col in df.columns])
-
-# Переименование столбцов на английский
-column_mapping = {
-    'Год': 'year',
-    'Месяц': 'month',
-    'Компания': 'dealer_name',
-    'Бренд': 'brand',
-    'Модель': 'model',
-    'Год выпуска': 'year_of_release',
-    'Вид топлива': 'fuel_type',
-    'Объём двиг, л,': 'engine_volume',
-    'Коробка передач': 'transmission_box',
-    'Тип привода': 'drive_type',
-    'Сегментация 2013': 'segment_2013',
-    'Регион': 'region',
-    'Область': 'area',
-    'Количество': 'quantity',
-    'Цена, USD': 'price_USD',
-    'Продажа, USD': 'sale_USD',
-    'Класс 2013': 'class_2013',
-    'Страна-производитель': 'country_of_origin'
-}
-
-df = df.rename(columns=column_mapping)
-
-# Удаление пустых строк и дубликатов
-df = df.dropna(how='all')
-df = df.drop_duplicates()
-
-df['country_of_origin'] = df['country_of_origin'].apply(country_to_alpha3)
-df['fuel_type'] = df['fuel_type'].apply(encode_fuel_type)
-df['drive_type'] = df['drive_type'].apply(standardize_drive_type)
-
-df = clean_numeric_columns(df)
-df = final_numeric_conversions(df)
-
-df = create_sale_date_column(df)
-df = remove_original_columns(df)
-
-df = clean_company_names(df)
-df = final_company_cleaning(df)
-
-df = apply_engine_cleaning(df)
-df = final_engine_cleaning(df)
-
-df['area'] = df.apply(correct_area, axis=1)
-df['area'] = df['area'].str.title()
-df['region'] = df['region'].str.title()
-df['region'] = df.apply(correct_region, axis=1)
-
-df['transmission_box'] = df['transmission_box'].apply(classify_transmission_simple)
-
-df = final_data_type_conversions(df)
-df = clean_year_column(df)
-df[['price_USD', 'sale_USD']] = df[['price_USD', 'sale_USD']].round(2)
-df = df.dropna(subset=['year_of_release', 'area', 'engine_volume'])
-eda(df)
-df = df.drop(columns=['sale_month'], axis=1)
-save(df)
-
-
-
-
+import argparse
+from pipeline import *
+from incremental import *
+from polars_backend import *
+
+# Защита нужна для пула процессов (--workers): на Windows и macOS воркеры заново импортируют main.py
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Подготовка и анализ данных о продажах автомобилей')
+    parser.add_argument('--input', default='autokz2019.csv', help='исходный CSV-файл')
+    parser.add_argument('--output', default=None, help='файл результата (по умолчанию processed_data.<формат>)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='обрабатывать файл по частям заданного размера (без отчета EDA)')
+    parser.add_argument('--format', default='csv', choices=SAVE_FORMATS, help='формат результата')
+    parser.add_argument('--partition-by-date', action='store_true',
+                        help='разбить parquet-результат по году и месяцу продажи')
+    parser.add_argument('--engine', default=None, choices=['c', 'python', 'pyarrow'],
+                        help='движок чтения CSV (pyarrow быстрее, но не работает с --chunksize)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='обработать только новые строки, дописав их к результату прошлых запусков')
+    parser.add_argument('--state-dir', default='state', help='каталог состояния для --incremental')
+    parser.add_argument('--timing-report', default=None,
+                        help='записать время, строки и память по стадиям в JSON-файл')
+    parser.add_argument('--profile-dir', default=None, help='сохранить профили cProfile по стадиям в каталог')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='замерять пик памяти стадий через tracemalloc (замедляет работу)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='кэшировать результаты стадий очистки в каталоге и переиспользовать их при повторных запусках')
+    parser.add_argument('--cache-size', type=int, default=2048, help='предельный размер кэша стадий, МБ')
+    parser.add_argument('--backend', default='pandas', choices=['pandas', 'polars'],
+                        help='библиотека для очистки: polars строит ленивый план (нужен пакет polars)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='число процессов для построчной очистки (по умолчанию один процесс)')
+    args = parser.parse_args()
+    if args.incremental and args.format == 'feather':
+        parser.error('Feather не поддерживает дозапись, в инкрементальном режиме используйте csv или parquet')
+    if args.incremental and args.chunksize:
+        parser.error('--incremental и --chunksize не совместимы')
+    if args.chunksize and args.format == 'feather':
+        parser.error('Feather не поддерживает дозапись, в потоковом режиме используйте csv или parquet')
+    if args.chunksize and args.engine == 'pyarrow':
+        parser.error('Движок pyarrow не поддерживает чтение по частям')
+
+    if args.backend == 'polars' and (args.chunksize or args.incremental):
+        parser.error('--backend polars работает только в режиме обработки всего файла')
+
+    if args.cache_dir and (args.chunksize or args.incremental or args.backend == 'polars'):
+        parser.error('--cache-dir работает только в режиме обработки всего файла на pandas')
+
+    runner = None
+    if args.timing_report or args.profile_dir or args.trace_memory:
+        runner = StageRunner(trace_memory=args.trace_memory, profile_dir=args.profile_dir)
+
+    if args.incremental:
+        run_incremental(args.input, args.output, state_dir=args.state_dir, file_format=args.format,
+                        partition_by_date=args.partition_by_date, engine=args.engine, runner=runner,
+                        workers=args.workers)
+    elif args.backend == 'polars':
+        run_polars(args.input, args.output, file_format=args.format, partition_by_date=args.partition_by_date,
+                   runner=runner)
+    elif args.chunksize:
+        run_streaming(args.input, args.output, chunksize=args.chunksize,
+                      file_format=args.format, partition_by_date=args.partition_by_date, engine=args.engine,
+                      runner=runner, workers=args.workers)
+    else:
+        run_full(args.input, args.output, file_format=args.format, partition_by_date=args.partition_by_date,
+                 engine=args.engine, runner=runner, workers=args.workers,
+                 cache=StageCache(args.cache_dir, args.cache_size * 2 ** 20) if args.cache_dir else None)
+
+    if runner is not None:
+        runner.save_report(args.timing_report or 'timing_report.json')
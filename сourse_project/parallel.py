@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+
+# Меньшие части не окупают передачу между процессами
+MIN_PART_ROWS = 10000
+
+# Пулы процессов по числу воркеров: в потоковом режиме один пул на все чанки
+_POOLS = {}
+
+
+def frame_to_ipc(df):
+    """
+    Сериализует DataFrame в поток Arrow IPC (вместе с индексом и типами pandas)
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def frame_from_ipc(buffer):
+    """
+    Восстанавливает DataFrame из потока Arrow IPC
+    """
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(buffer).read_all().to_pandas()
+
+
+def apply_to_ipc(func, buffer, collect=None):
+    """
+    Выполняется в воркере: разбирает часть, применяет func и отдает результат тоже в Arrow IPC
+    вместе со счетчиками collect(), накопленными при обработке этой части
+    """
+    if collect is not None:
+        # Счетчики, унаследованные от родителя при fork, уже учтены в родителе
+        collect()
+    result = frame_to_ipc(func(frame_from_ipc(buffer)))
+    return result, collect() if collect is not None else None
+
+
+def get_pool(workers):
+    """
+    Пул процессов на workers воркеров, создается один раз
+    """
+    if workers not in _POOLS:
+        _POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _POOLS[workers]
+
+
+def split_rows(df, parts):
+    """
+    Делит DataFrame на parts подряд идущих частей по строкам
+    """
+    bounds = np.linspace(0, len(df), parts + 1).astype(int)
+    return [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def concat_parts(frames):
+    """
+    Склеивает части с теми же типами, что у func(df) для всего df. pd.concat превращает
+    категориальный столбец в object, если категории частей различаются: категории объединяются
+    и упорядочиваются так же, как pd.Categorical упорядочивает их для всего столбца
+    """
+    result = pd.concat(frames)
+    for col in result.columns:
+        dtypes = [frame[col].dtype for frame in frames]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            if not isinstance(result[col].dtype, pd.CategoricalDtype):
+                categories = pd.Categorical(np.concatenate([dtype.categories for dtype in dtypes])).categories
+                result[col] = pd.Categorical(result[col], categories=categories)
+        elif all(dtype == dtypes[0] for dtype in dtypes) and result[col].dtype != dtypes[0]:
+            result[col] = result[col].astype(dtypes[0])
+    return result
+
+
+def run_parallel(df, func, workers=None, collect=None, merge=None):
+    """
+    Применяет построчную функцию func к частям df в пуле процессов и склеивает результаты
+    в исходном порядке, поэтому результат (значения и типы столбцов) совпадает с func(df).
+    Части передаются в Arrow IPC, а не через pickle.
+    collect - функция воркера, которая возвращает и обнуляет его счетчики (например, срабатывания
+    правил), merge - функция родителя, которая добавляет их к своим
+    """
+    workers = workers or os.cpu_count()
+    # По несколько частей на воркер, чтобы выровнять нагрузку
+    parts = min(workers * 4, len(df) // MIN_PART_ROWS)
+    if workers < 2 or parts < 2:
+        return func(df)
+
+    buffers = [frame_to_ipc(part) for part in split_rows(df, parts)]
+    results = list(get_pool(workers).map(partial(apply_to_ipc, func, collect=collect), buffers))
+    if merge is not None:
+        for _, stats in results:
+            merge(stats)
+    return concat_parts([frame_from_ipc(buffer) for buffer, _ in results])
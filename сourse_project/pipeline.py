@@ -0,0 +1,321 @@
+import os
+import tempfile
+import pandas as pd
+from load_data import *
+from sale_date import *
+from country_of_origin import *
+from fuel_type import *
+from dealer_name import *
+from engine_volume import *
+from region_area import *
+from transmission import *
+from type_conversions import *
+from quan_price_sale import *
+from drive_type import *
+from year_of_release import *
+from EDA import *
+from dealer_benchmark import *
+from save import *
+from unique_mapping import *
+from profiling import *
+from parallel import *
+from stage_cache import *
+from deduplication import *
+
+# Copy-on-write: drop и выборки столбцов не копируют данные, пока их не изменят
+# (в pandas 3 включено всегда). Стадии заменяют столбцы целиком, поэтому копии не нужны
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+def normalize_categories(df):
+    """
+    Страна, топливо и привод: нормализация по уникальным значениям (страна - по таблице
+    data/countries.json, топливо и привод - по правилам из data/normalization_rules.json)
+    """
+    df['country_of_origin'] = country_series_to_alpha3(df['country_of_origin'])
+    df['fuel_type'] = encode_fuel_type_series(df['fuel_type'])
+    df['drive_type'] = standardize_drive_type_series(df['drive_type'])
+    return df
+
+
+def clean_numeric(df):
+    """
+    Количество, цена и сумма продажи
+    """
+    df = clean_numeric_columns(df)
+    return final_numeric_conversions(df)
+
+
+def build_sale_date(df):
+    """
+    Дата продажи из года и месяца, исходные столбцы удаляются
+    """
+    df['sale_date'] = create_sale_date_column(df)
+    return remove_original_columns(df)
+
+
+def clean_dealers(df):
+    """
+    Стандартизация названий дилеров
+    """
+    df['dealer_name'] = clean_company_names(df['dealer_name'])
+    return df
+
+
+def clean_engine_column(df):
+    """
+    Очистка объема двигателя (пропуски заполняются в завершающих стадиях)
+    """
+    df['engine_volume'] = clean_engine_volume_series(df['engine_volume'], df.get('brand'), df.get('model'))
+    return df
+
+
+def clean_area_region(df):
+    """
+    Исправление области и региона по таблицам из data/regions.json
+    """
+    df['area'] = correct_area(df['area'])
+    df['region'] = correct_region(df['region'])
+    return df
+
+
+def clean_transmission(df):
+    """
+    Тип коробки передач по правилам из data/normalization_rules.json
+    """
+    df['transmission_box'] = classify_transmission_series(df['transmission_box'])
+    return df
+
+
+def round_prices(df):
+    """
+    Округление цены и суммы продажи до центов
+    """
+    df[['price_USD', 'sale_USD']] = df[['price_USD', 'sale_USD']].round(2)
+    return df
+
+
+def drop_incomplete(df):
+    """
+    Удаление строк без года выпуска, области или объема двигателя
+    """
+    return df.dropna(subset=['year_of_release', 'area', 'engine_volume'])
+
+
+# Построчные стадии очистки: результат для строки не зависит от остальных строк
+ROW_STAGES = [
+    ('categories', normalize_categories),
+    ('numeric', clean_numeric),
+    ('sale_date', build_sale_date),
+    ('dealer_name', clean_dealers),
+    ('engine_volume', clean_engine_column),
+    ('area_region', clean_area_region),
+    ('transmission', clean_transmission)
+]
+
+
+def fill_engine_volume(df, brand_medians=None):
+    """
+    Заполнение пропусков объема двигателя медианой по бренду
+    """
+    df['engine_volume'] = final_engine_cleaning(df, brand_medians=brand_medians)
+    return df
+
+
+def convert_types(df):
+    """
+    Категориальные типы текстовых признаков
+    """
+    for col, values in final_data_type_conversions(df).items():
+        df[col] = values
+    return df
+
+
+def optimize_memory(df, dictionaries=None):
+    """
+    Компактные типы столбцов с отчетом о памяти до и после
+    """
+    memory_before = frame_memory(df)
+    for col, values in optimize_dtypes(df, dictionaries).items():
+        df[col] = values
+    memory_after = frame_memory(df)
+    print(f"Память данных: {memory_before / 2 ** 20:.1f} МБ -> {memory_after / 2 ** 20:.1f} МБ "
+          f"(в {memory_before / max(memory_after, 1):.1f} раза меньше)")
+    return df
+
+
+def final_stages(brand_medians=None, dictionaries=None, last_sale_year=None):
+    """
+    Завершающие стадии: заполнение объема двигателя медианой по бренду, типы данных, год выпуска,
+    компактные типы (dictionaries - общие словари категорий). last_sale_year - последний год продажи
+    во всех данных (при обработке по частям), по умолчанию считается по обрабатываемой части
+    """
+    return [
+        ('engine_volume_fill', lambda df: fill_engine_volume(df, brand_medians=brand_medians)),
+        ('type_conversions', convert_types),
+        ('year_of_release', lambda df: clean_year_column(df, last_sale_year=last_sale_year)),
+        ('round_prices', round_prices),
+        ('drop_incomplete', drop_incomplete),
+        ('optimize_dtypes', lambda df: optimize_memory(df, dictionaries))
+    ]
+
+
+def row_stages(workers=None):
+    """
+    Построчные стадии; с workers > 1 - одна стадия, которая делит строки на части
+    и выполняет ROW_STAGES параллельно в пуле процессов
+    """
+    if workers is not None and workers > 1:
+        # Счетчики нормализации воркеров складываются в счетчики этого процесса
+        return [('clean_rows_parallel',
+                 lambda df: run_parallel(df, clean_rows, workers,
+                                         collect=pop_normalization_stats, merge=add_normalization_stats))]
+    return ROW_STAGES
+
+
+def clean_rows(df, runner=None, workers=None):
+    """
+    Выполняет построчные стадии
+    """
+    return run_stages(df, row_stages(workers), runner)
+
+
+def finalize_rows(df, brand_medians=None, runner=None, dictionaries=None, last_sale_year=None):
+    """
+    Выполняет завершающие стадии
+    """
+    return run_stages(df, final_stages(brand_medians, dictionaries, last_sale_year), runner)
+
+
+def normalization_stats(reset=False):
+    """
+    Счетчики нормализации этого процесса: срабатывания правил и неизвестные страны.
+    С reset=True счетчики обнуляются (так воркер отдает только то, что насчитал сам)
+    """
+    return {'rule_hits': rule_hits(reset=reset),
+            'unknown_countries': DEFAULT_COUNTRY_MAPPER.counts(reset)}
+
+
+def pop_normalization_stats():
+    """
+    Счетчики нормализации с обнулением - для передачи из воркера в родительский процесс
+    """
+    return normalization_stats(reset=True)
+
+
+def add_normalization_stats(stats):
+    """
+    Добавляет счетчики нормализации из воркера или из кэша стадий
+    """
+    add_rule_hits(stats['rule_hits'])
+    DEFAULT_COUNTRY_MAPPER.add_counts(stats['unknown_countries'])
+
+
+def report_normalization():
+    """
+    Отчет нормализации: срабатывания правил и неизвестные страны
+    """
+    report_rule_hits()
+    DEFAULT_COUNTRY_MAPPER.report()
+
+
+def report_stage(df):
+    """
+    Отчет EDA и сравнение дилеров по одному кубу агрегатов
+    """
+    aggregates = build_eda_aggregates(df)
+    eda(df, aggregates=aggregates)
+    save_dealer_benchmark(benchmark_dealers(aggregates.cube))
+    return df
+
+
+def output_stages(output_filename=None, file_format='csv', partition_by_date=False):
+    """
+    Стадии после очистки: отчет EDA, признаки дат и сохранение результата
+    """
+    def save_stage(df):
+        save(df, output_filename, file_format=file_format, partition_by_date=partition_by_date)
+        return df
+
+    return [
+        ('eda', report_stage),
+        ('date_features', lambda df: add_date_features(df).drop(columns=['sale_month'])),
+        ('save', save_stage)
+    ]
+
+
+def run_full(path='autokz2019.csv', output_filename=None, file_format='csv', partition_by_date=False,
+             engine=None, runner=None, workers=None, cache=None):
+    """
+    Обрабатывает весь файл в памяти и строит отчет EDA.
+    С cache (StageCache) результаты стадий очистки берутся из кэша, если не изменились
+    исходный файл, код стадий и их параметры; счетчики нормализации восстанавливаются из кэша
+    """
+    cleaning_stages = [
+        ('read_source', lambda df: read_source(path, engine=engine)),
+        ('drop_empty', lambda df: df.dropna(how='all')),
+        *row_stages(workers),
+        # Дубликаты ищутся после нормализации, чтобы учесть различия в написании
+        ('deduplicate', deduplicate),
+        *final_stages()
+    ]
+    if cache is not None:
+        # Вместе с результатами стадий кэшируются счетчики нормализации, чтобы отчет
+        # не терялся, когда стадии нормализации берутся из кэша
+        df = cache.run(cleaning_stages, file_digest(path), runner,
+                       snapshot=normalization_stats, restore=add_normalization_stats)
+    else:
+        df = run_stages(None, cleaning_stages, runner)
+    report_normalization()
+    run_stages(df, output_stages(output_filename, file_format, partition_by_date), runner)
+
+
+def run_streaming(path='autokz2019.csv', output_filename=None, chunksize=100000,
+                  file_format='csv', partition_by_date=False, engine=None, runner=None, workers=None):
+    """
+    Потоковая обработка по чанкам: память ограничена размером чанка и компактным состоянием.
+    Первый проход выполняет построчные стадии, удаляет дубликаты по хэшам ключевых столбцов
+    (в том числе повторы строк из предыдущих чанков), накапливает количества объемов
+    двигателя по брендам и общие словари категорий. Второй проход заполняет пропуски медианами
+    по бренду и дописывает результат в выходной файл
+    """
+    deduplicator = Deduplicator()
+    engine_counts = None
+    last_sale_year = None
+    dictionaries = {}
+    n_rows = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parts = []
+        for i, chunk in enumerate(read_source(path, chunksize=chunksize, engine=engine)):
+            chunk = chunk.dropna(how='all')
+            chunk = clean_rows(chunk, runner, workers)
+            chunk = deduplicator.drop(chunk)
+            engine_counts = count_engine_volumes(chunk, engine_counts)
+            # Общие словари: категории одинаковы во всех чанках
+            dictionaries = update_dictionaries(dictionaries, chunk, report=False)
+            n_rows += len(chunk)
+            # Граница года выпуска для строк без даты продажи - по всем чанкам, как при обработке всего файла
+            chunk_year = max_sale_year(chunk)
+            if not pd.isna(chunk_year):
+                last_sale_year = chunk_year if last_sale_year is None else max(last_sale_year, chunk_year)
+            part_path = os.path.join(tmp_dir, f'part_{i}.pkl')
+            chunk.to_pickle(part_path)
+            parts.append(part_path)
+
+        deduplicator.report()
+        report_normalization()
+        brand_medians = brand_medians_from_counts(engine_counts)
+        # Какие столбцы станут категориальными, решается один раз по всем строкам
+        dictionaries = choose_dictionaries(dictionaries, n_rows)
+
+        total_rows = 0
+        for i, part_path in enumerate(parts):
+            chunk = finalize_rows(pd.read_pickle(part_path), brand_medians=brand_medians, runner=runner,
+                                  dictionaries=dictionaries, last_sale_year=last_sale_year)
+            chunk = add_date_features(chunk).drop(columns=['sale_month'])
+            save(chunk, output_filename, append=i > 0,
+                 file_format=file_format, partition_by_date=partition_by_date)
+            total_rows += len(chunk)
+    print(f"Потоковая обработка завершена, всего записей: {total_rows}")
@@ -0,0 +1,214 @@
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from pipeline import *
+
+# Строки, которые pandas.read_csv по умолчанию считает пропусками
+PANDAS_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+# Столбцы, которые нормализуются функциями из модулей очистки по уникальным значениям
+UNIQUE_MAPPED_COLUMNS = {
+    'country_of_origin': DEFAULT_COUNTRY_MAPPER.code,
+    'fuel_type': encode_fuel_type,
+    'drive_type': standardize_drive_type,
+    'transmission_box': classify_transmission_simple,
+    'dealer_name': DEFAULT_DEALER_NORMALIZER.standardize,
+    'area': correct_area_value,
+    'region': correct_region_value
+}
+
+# Наборы правил и таблица стран, которые ведут счетчики строк по значениям столбцов
+COUNTED_COLUMNS = {
+    'country_of_origin': DEFAULT_COUNTRY_MAPPER,
+    'fuel_type': FUEL_TYPE_RULES,
+    'drive_type': DRIVE_TYPE_RULES,
+    'transmission_box': TRANSMISSION_RULES
+}
+
+# Столбцы, которые pandas-версия хранит как категориальные
+CATEGORICAL_RESULT_COLUMNS = ['brand', 'model', 'fuel_type', 'transmission_box', 'drive_type',
+                              'segment_2013', 'class_2013']
+
+
+def scan_source_polars(path='autokz2019.csv'):
+    """
+    Ленивое чтение исходного файла: те же столбцы, названия и разбор чисел, что в read_source
+    """
+    import polars as pl
+
+    usecols = source_usecols(path)
+    lf = pl.scan_csv(path, separator=';', infer_schema=False, null_values=PANDAS_NA_VALUES)
+    lf = lf.select(usecols).rename({col: COLUMN_MAPPING.get(col, col) for col in usecols})
+    numeric = [COLUMN_MAPPING[col] for col in NUMERIC_SOURCE_COLUMNS if col in usecols]
+    # Разделитель тысяч - пробел, десятичный - запятая
+    return lf.with_columns(
+        pl.col('year').cast(pl.Int64),
+        *[pl.col(col).str.replace_all(r'[\s\xa0]', '').str.replace_all(',', '.', literal=True)
+          .cast(pl.Float64, strict=False) for col in numeric]
+    )
+
+
+def value_counts(lf, columns):
+    """
+    Уникальные значения нескольких столбцов и число строк с каждым из них за один проход по файлу:
+    {столбец: (значения, количества)}
+    """
+    import polars as pl
+
+    row = lf.select([pl.col(col).value_counts().implode() for col in columns]).collect().row(0, named=True)
+    return {col: ([item[col] for item in row[col]], [item['count'] for item in row[col]]) for col in columns}
+
+
+def mapping_expr(column, func, values):
+    """
+    Выражение, заменяющее каждое значение столбца на func(значение); func вычисляется
+    один раз на уникальное значение, пропуск передается в func как np.nan
+    """
+    import polars as pl
+
+    mapping = {}
+    null_result = None
+    for value in values:
+        result = func(np.nan if value is None else value)
+        result = None if pd.isna(result) else result
+        if value is None:
+            null_result = result
+        else:
+            mapping[value] = result
+    expr = pl.col(column).replace_strict(mapping, default=None, return_dtype=pl.String)
+    if null_result is not None:
+        expr = pl.when(pl.col(column).is_null()).then(pl.lit(null_result)).otherwise(expr)
+    return expr.alias(column)
+
+
+def engine_volume_expr():
+    """
+    Правила clean_engine_volume_series в виде выражения Polars
+    """
+    import polars as pl
+
+    cleaned = (pl.col('engine_volume').str.strip_chars()
+               .str.replace_all(',', '.', literal=True)
+               .str.replace_all('[Ll ]', ''))
+    garbage = cleaned.str.to_lowercase().str.contains_any(GARBAGE_ENGINE_VALUES)
+    numeric = pl.when(garbage).then(None).otherwise(
+        cleaned.str.extract(ENGINE_NUMBER_PATTERN.pattern, 1).cast(pl.Float64, strict=False))
+    divided = numeric / 10
+
+    # Пропуск бренда или модели pandas-версия видит как строку 'nan'
+    brand = pl.col('brand').fill_null('nan').str.to_lowercase()
+    model = pl.col('model').fill_null('nan').str.to_lowercase()
+    special = ((brand.str.contains('chevrolet', literal=True) & model.str.contains('niva', literal=True))
+               | brand.str.contains('jaguar', literal=True))
+
+    result = (pl.when(numeric > 50).then(pl.when(divided.is_between(0.5, 8.0)).then(divided))
+              .when(special & (numeric > 10)).then(divided)
+              .when(numeric.is_between(0.5, 8.0)).then(numeric))
+    # Округление как у встроенного round(), по уникальным значениям
+    return result.map_batches(lambda values: pl.Series(round_unique(values.to_numpy())).fill_nan(None),
+                              return_dtype=pl.Float64).alias('engine_volume')
+
+
+def clean_lazy(lf, mapped_values):
+    """
+    Построчные стадии очистки и удаление дубликатов по ключевым столбцам в виде одного ленивого плана
+    """
+    import polars as pl
+
+    month_numbers = pl.col('month').replace_strict(create_month_mapping(), default=None, return_dtype=pl.Int8)
+    sale_date = pl.date(pl.col('year'), month_numbers, 1).dt.month_end()
+    years = pl.col('year_of_release').str.replace_all('[^0-9]', '').cast(pl.Int64, strict=False)
+    # Год выпуска - не позже года продажи плюс MAX_YEARS_AHEAD, как в clean_year_column;
+    # без даты продажи - не позже последнего года продажи в данных
+    sale_years = sale_date.dt.year()
+    max_years = sale_years.fill_null(sale_years.max()) + MAX_YEARS_AHEAD
+    columns = [col for col in lf.collect_schema().names() if col not in ['year', 'month']]
+    # Ключ дубликатов - как в deduplication.canonical_values: у года выпуска только цифры
+    key = ['year_key' if col == 'year_of_release' else col for col in DEDUP_KEY_COLUMNS]
+
+    return lf.with_columns(
+        *[mapping_expr(col, func, mapped_values[col]) for col, func in UNIQUE_MAPPED_COLUMNS.items()],
+        engine_volume_expr(),
+        sale_date=sale_date.cast(pl.Datetime('ns')),
+        quantity=pl.col('quantity').fill_null(1).cast(pl.Int64),
+        price_USD=pl.col('price_USD').clip(lower_bound=0).round(2),
+        sale_USD=pl.col('sale_USD').clip(lower_bound=0).round(2),
+        year_of_release=pl.when(years.is_between(MIN_YEAR_OF_RELEASE, max_years)).then(years).cast(pl.Int16),
+        segment_2013=pl.col('segment_2013').fill_null('nan'),
+        class_2013=pl.col('class_2013').fill_null('nan'),
+        year_key=pl.col('year_of_release').fill_null('').str.replace_all('[^0-9]', '')
+    ).unique(subset=key, keep='first', maintain_order=True).select(columns + ['sale_date'])
+
+
+def clean_polars(path='autokz2019.csv'):
+    """
+    Очистка файла на Polars: чтение, удаление пустых строк, построчные стадии и дубликаты,
+    заполнение объема двигателя медианой по бренду. Возвращает pandas DataFrame
+    с теми же значениями, что и очистка на pandas
+    """
+    import polars as pl
+
+    lf = scan_source_polars(path)
+    lf = lf.filter(~pl.all_horizontal(pl.all().is_null()))
+    counts = value_counts(lf, list(UNIQUE_MAPPED_COLUMNS))
+    # Счетчики - по строкам до удаления дубликатов, как в построчных стадиях pandas-версии
+    for col, counter in COUNTED_COLUMNS.items():
+        counter.count_values(*counts[col])
+    lf = clean_lazy(lf, {col: values for col, (values, _) in counts.items()}).cache()
+
+    # Медианы по брендам - из количеств значений, как в потоковом режиме
+    counts = (lf.drop_nulls(['brand', 'engine_volume']).group_by(['brand', 'engine_volume']).len()
+              .collect(engine='streaming').to_pandas().set_index(['brand', 'engine_volume'])['len'])
+    brand_medians = brand_medians_from_counts(counts)
+
+    medians = pl.col('brand').replace_strict(brand_medians.to_dict(), default=None, return_dtype=pl.Float64)
+    result = (lf.with_columns(pl.col('engine_volume').fill_null(medians))
+              .drop_nulls(['year_of_release', 'area', 'engine_volume'])
+              .collect(engine='streaming'))
+
+    df = result.to_pandas()
+    df[CATEGORICAL_RESULT_COLUMNS] = df[CATEGORICAL_RESULT_COLUMNS].astype('category')
+    df['year_of_release'] = df['year_of_release'].astype('Int16')
+    return df
+
+
+def run_polars(path='autokz2019.csv', output_filename=None, file_format='csv', partition_by_date=False,
+               runner=None):
+    """
+    То же, что run_full, но очистка выполняется ленивым планом Polars
+    """
+    stages = [
+        ('clean_polars', lambda df: clean_polars(path)),
+        ('optimize_dtypes', optimize_memory)
+    ]
+    df = run_stages(None, stages, runner)
+    report_normalization()
+    run_stages(df, output_stages(output_filename, file_format, partition_by_date), runner)
+
+
+def check_parity(path='autokz2019.csv'):
+    """
+    Сравнивает результат очистки на Polars и на pandas: значения, типы столбцов и категории
+    (вместе с их порядком). Оба результата проходят optimize_memory, как в run_full и run_polars,
+    поэтому других различий в типах быть не должно
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = read_source(path).dropna(how='all')
+        expected = finalize_rows(deduplicate(clean_rows(df))).reset_index(drop=True)
+        actual = optimize_memory(clean_polars(path))
+
+    try:
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    except AssertionError as e:
+        print(f"Результаты Polars и pandas различаются: {e}")
+        return False
+    print(f"Результаты Polars и pandas совпадают: {len(actual)} строк")
+    return True
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(0 if check_parity(sys.argv[1] if len(sys.argv) > 1 else 'autokz2019.csv') else 1)
@@ -0,0 +1,124 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+import pandas as pd
+
+
+def frame_memory(df):
+    """
+    Память, занимаемая DataFrame (с учетом строк), в байтах
+    """
+    if not isinstance(df, pd.DataFrame):
+        return 0
+    return int(df.memory_usage(deep=True).sum())
+
+
+def frame_rows(df):
+    """
+    Число строк DataFrame (0, если стадия еще не получила данные)
+    """
+    return len(df) if isinstance(df, pd.DataFrame) else 0
+
+
+class StageRunner:
+    """
+    Выполняет стадии пайплайна и замеряет для каждой время, число строк на входе и выходе
+    и изменение памяти. С trace_memory дополнительно пишется пик выделенной памяти по tracemalloc,
+    с profile_dir - профиль cProfile для каждой стадии (<profile_dir>/<стадия>.prof)
+    """
+
+    def __init__(self, measure_memory=True, trace_memory=False, profile_dir=None):
+        self.measure_memory = measure_memory
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.timings = []
+        self.profilers = {}
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def run_stage(self, name, func, df):
+        """
+        Выполняет одну стадию: func(df) -> df
+        """
+        rows_in = frame_rows(df)
+        memory_in = frame_memory(df) if self.measure_memory else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        profiler = None
+        if self.profile_dir is not None:
+            profiler = self.profilers.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            df = func(df)
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+
+        timing = {'stage': name, 'seconds': seconds, 'rows_in': rows_in, 'rows_out': frame_rows(df)}
+        if self.measure_memory:
+            memory_out = frame_memory(df)
+            timing.update(memory_in=memory_in, memory_out=memory_out, memory_delta=memory_out - memory_in)
+        if self.trace_memory:
+            timing['traced_peak'] = tracemalloc.get_traced_memory()[1] - traced_before
+        self.timings.append(timing)
+        return df
+
+    def run(self, df, stages):
+        """
+        Последовательно выполняет список стадий [(название, функция), ...]
+        """
+        for name, func in stages:
+            df = self.run_stage(name, func, df)
+        return df
+
+    def summary(self):
+        """
+        Итоги по стадиям: в потоковом режиме одна стадия выполняется для каждого чанка
+        """
+        if not self.timings:
+            return pd.DataFrame()
+        timings = pd.DataFrame(self.timings)
+        summary = timings.groupby('stage', sort=False).sum(numeric_only=True)
+        summary.insert(0, 'calls', timings.groupby('stage', sort=False).size())
+        return summary.reset_index()
+
+    def save_report(self, path='timing_report.json'):
+        """
+        Сохраняет отчет о времени стадий в JSON и сбрасывает профили cProfile
+        """
+        report = {
+            'stages': self.summary().to_dict(orient='records'),
+            'calls': self.timings
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=float)
+        print(f"Отчет о времени стадий сохранён в файл: {path}")
+        self.dump_profiles()
+
+    def dump_profiles(self):
+        """
+        Записывает накопленные профили cProfile по стадиям
+        """
+        if self.profile_dir is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profiler in self.profilers.items():
+            profiler.dump_stats(os.path.join(self.profile_dir, f'{name}.prof'))
+        print(f"Профили стадий сохранены в каталог: {self.profile_dir}")
+
+
+def run_stages(df, stages, runner=None):
+    """
+    Выполняет стадии через runner, а без него - просто по очереди
+    """
+    if runner is not None:
+        return runner.run(df, stages)
+    for name, func in stages:
+        df = func(df)
+    return df
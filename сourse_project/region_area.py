@@ -1,28 +1,70 @@
+import json
+import os
+from functools import lru_cache
 import numpy as np
+from unique_mapping import map_unique
 
+# Таблицы замен области и региона: города вместо области и значения-заглушки (экспорт)
+REGIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'regions.json')
 
-def correct_area(row):
-    region = row['area']
 
-    # Если область указана как город
-    if region == 'г.Алматы':
-        return 'Алматинская область'
-    elif region == 'г.Нур-Султан':
-        return 'Акмолинская область'
-    elif region == 'Экспорт область':
-        return np.nan
-    elif region is None:
-        return np.nan
-    else:
-        return region
+def load_region_tables(path=REGIONS_FILE):
+    """
+    Загружает таблицы замен: для каждого столбца словарь aliases (значение -> замена)
+    и список missing (значения, которые считаются пропуском)
+    """
+    with open(path, encoding='utf-8') as f:
+        tables = json.load(f)
+    return {col: {'aliases': table.get('aliases', {}), 'missing': table.get('missing', [])}
+            for col, table in tables.items()}
 
-def correct_region(row):
-    region = row['region']
 
-    # Если область указана как город
-    if region == 'Экспорт':
-        return np.nan
-    elif region is None:
+REGION_TABLES = load_region_tables()
+
+# Число исправленных значений, которые кэшируются между чанками
+LOCATION_CACHE_SIZE = 100000
+
+
+@lru_cache(maxsize=LOCATION_CACHE_SIZE)
+def correct_location(value, column):
+    """
+    Исправляет одно значение области или региона по таблице столбца и приводит его к str.title().
+    Значение ищется в таблице как есть и в виде str.title()
+    """
+    if not isinstance(value, str):
         return np.nan
-    else:
-        return region
\ No newline at end of file
+    table = REGION_TABLES[column]
+    for key in (value, value.title()):
+        if key in table['missing']:
+            return np.nan
+        if key in table['aliases']:
+            return table['aliases'][key].title()
+    return value.title()
+
+
+def correct_area_value(value):
+    """
+    Исправление одного значения области
+    """
+    return correct_location(value, 'area')
+
+
+def correct_region_value(value):
+    """
+    Исправление одного значения региона
+    """
+    return correct_location(value, 'region')
+
+
+def correct_area(values):
+    """
+    Исправление столбца области: город вместо области заменяется областью, экспорт - пропуск
+    """
+    return map_unique(values, correct_area_value, categorical=True)
+
+
+def correct_region(values):
+    """
+    Исправление столбца региона: экспорт - пропуск
+    """
+    return map_unique(values, correct_region_value, categorical=True)
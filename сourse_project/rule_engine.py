@@ -0,0 +1,176 @@
+import json
+import os
+import re
+from functools import lru_cache
+import pandas as pd
+from unique_mapping import map_unique
+
+# Правила нормализации категориальных признаков
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'normalization_rules.json')
+
+# Подготовка строки перед проверкой правил
+PREPROCESSORS = {
+    'lower': lambda text: text.lower(),
+    'upper': lambda text: text.upper(),
+    'strip': lambda text: text.strip(),
+    'first_line': lambda text: text.split('\n', 1)[0]
+}
+
+
+def load_rules(path=RULES_FILE):
+    """
+    Загружает наборы правил из JSON или YAML: {столбец: набор правил}
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Для загрузки YAML нужен пакет PyYAML")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def compile_rule(rule, flags=0):
+    """
+    Одно правило в виде функции проверки строки. Правило задает хотя бы одно из условий:
+    keywords - подстроки, patterns - регулярные выражения, values - точные значения
+    """
+    alternatives = [re.escape(word) for word in rule.get('keywords', [])] + rule.get('patterns', [])
+    regex = re.compile('|'.join(alternatives), flags) if alternatives else None
+    values = set(rule.get('values', []))
+    return lambda text: text in values or (regex is not None and regex.search(text) is not None)
+
+
+class RuleMatcher:
+    """
+    Скомпилированный набор правил: правила проверяются по порядку, первое сработавшее дает код.
+    spec - словарь с ключами rules (name, code и условия), preprocess (шаги из PREPROCESSORS),
+    ignore_case, missing (код для пропуска) и default (код, если ни одно правило не сработало).
+    hits - число строк, обработанных каждым правилом
+    """
+
+    def __init__(self, spec, cache_size=100000):
+        self.spec = spec
+        self.rules = spec['rules']
+        self.preprocess = [PREPROCESSORS[step] for step in spec.get('preprocess', [])]
+        flags = re.IGNORECASE if spec.get('ignore_case') else 0
+        self.checks = [compile_rule(rule, flags) for rule in self.rules]
+        self.missing = spec.get('missing')
+        self.default = spec.get('default')
+        # Правило для значения кэшируется между чанками
+        self.match = lru_cache(maxsize=cache_size)(self.find_rule)
+        # Код по имени правила; default и missing - коды без сработавшего правила и для пропуска
+        self.codes = {rule['name']: rule['code'] for rule in self.rules}
+        self.codes.update({'default': self.default, 'missing': self.missing})
+        self.hits = dict.fromkeys(self.codes, 0)
+
+    def __getstate__(self):
+        # Передается только набор правил: счетчики и кэш относятся к процессу
+        return self.spec
+
+    def __setstate__(self, spec):
+        self.__init__(spec)
+
+    def find_rule(self, value):
+        """
+        Имя первого сработавшего правила или 'default'
+        """
+        text = str(value)
+        for step in self.preprocess:
+            text = step(text)
+        for rule, check in zip(self.rules, self.checks):
+            if check(text):
+                return rule['name']
+        return 'default'
+
+    def __call__(self, value):
+        """
+        Код для одного значения (без учета в счетчиках)
+        """
+        if pd.isna(value):
+            return self.missing
+        return self.codes[self.match(value)]
+
+    def apply(self, series):
+        """
+        Коды для столбца: правила проверяются один раз на уникальное значение,
+        счетчики увеличиваются на число строк, обработанных каждым правилом
+        """
+        rule_names = map_unique(series, self.match, na_value='missing', categorical=True)
+        for name, count in rule_names.value_counts().items():
+            self.hits[name] += int(count)
+        return map_unique(rule_names, self.codes.get, categorical=True)
+
+    def count_values(self, values, counts):
+        """
+        Учитывает в счетчиках уже подсчитанные значения: values - уникальные значения
+        столбца, counts - число строк с каждым из них
+        """
+        for value, count in zip(values, counts):
+            name = 'missing' if pd.isna(value) else self.match(value)
+            self.hits[name] += int(count)
+
+    def counts(self, reset=False):
+        """
+        Копия счетчиков; с reset=True счетчики обнуляются
+        """
+        hits = dict(self.hits)
+        if reset:
+            self.hits = dict.fromkeys(self.codes, 0)
+        return hits
+
+    def add_counts(self, hits):
+        """
+        Добавляет счетчики, накопленные в другом процессе или сохраненные в кэше
+        """
+        for name, count in hits.items():
+            self.hits[name] = self.hits.get(name, 0) + count
+
+    def report(self, title):
+        """
+        Печатает число строк по правилам
+        """
+        print(f"Правила «{title}»:")
+        for name, count in self.hits.items():
+            if count:
+                print(f"  {name}: {count}")
+
+
+def compile_rules(rules=None):
+    """
+    Компилирует все наборы правил: {столбец: RuleMatcher}
+    """
+    rules = load_rules() if rules is None else rules
+    return {column: RuleMatcher(spec) for column, spec in rules.items()}
+
+
+# Правила компилируются один раз при импорте
+NORMALIZATION_RULES = compile_rules()
+
+
+def rule_hits(matchers=None, reset=False):
+    """
+    Счетчики всех наборов правил: {столбец: {правило: число строк}}
+    """
+    matchers = NORMALIZATION_RULES if matchers is None else matchers
+    return {column: matcher.counts(reset) for column, matcher in matchers.items()}
+
+
+def add_rule_hits(hits, matchers=None):
+    """
+    Добавляет счетчики, полученные от rule_hits в другом процессе
+    """
+    matchers = NORMALIZATION_RULES if matchers is None else matchers
+    for column, counts in hits.items():
+        matchers[column].add_counts(counts)
+
+
+def report_rule_hits(matchers=None):
+    """
+    Печатает счетчики всех наборов правил, которые применялись к данным
+    """
+    matchers = NORMALIZATION_RULES if matchers is None else matchers
+    for column, matcher in matchers.items():
+        if any(matcher.hits.values()):
+            matcher.report(column)
@@ -20,55 +20,37 @@ def create_month_mapping():
     }
     return month_mapping
 
-def create_sale_date(year, month_name):
+def create_sale_date_series(years, months):
     """
-    Создает дату продажи - последний день месяца
+    Создает даты продажи - последний день месяца - для целых столбцов года и месяца
     """
-    try:
-        # Преобразуем название месяца в число
-        month_mapping = create_month_mapping()
-        month_num = month_mapping.get(month_name)
-
-        if month_num is None:
-            return pd.NaT
-        # Определяем последний день месяца
-        if month_num in [1, 3, 5, 7, 8, 10, 12]:
-            last_day = 31
-        elif month_num in [4, 6, 9, 11]:
-            last_day = 30
-        elif month_num == 2:
-            # Февраль 2019 - не високосный
-            last_day = 28
-        else:
-            return pd.NaT
-        return pd.Timestamp(year=year, month=month_num, day=last_day)
-    except Exception as e:
-        return pd.NaT
+    # Номер месяца через категориальный тип: код категории + 1, неизвестный месяц дает -1
+    month_names = list(create_month_mapping())
+    month_codes = pd.Categorical(months, categories=month_names).codes
+    month_nums = pd.Series(month_codes + 1, index=years.index, dtype='float64').where(month_codes >= 0)
+    first_days = pd.to_datetime(
+        pd.DataFrame({'year': pd.to_numeric(years, errors='coerce'), 'month': month_nums, 'day': 1}),
+        errors='coerce'
+    )
+    # Сдвиг к концу месяца учитывает високосные годы
+    return first_days + pd.offsets.MonthEnd(0)
 
 
 def create_sale_date_column(df):
     """
-    Создает столбец с датой продажи
+    Создает столбец с датой продажи и возвращает его
     """
-    # Проверяем наличие необходимых столбцов
-    if 'year' not in df.columns or 'month' not in df.columns:
-        print("Отсутствуют столбцы year или month")
-        return df
     # Создаем новый столбец
-    df['sale_date'] = df.apply(
-        lambda row: create_sale_date(row['year'], row['month']),
-        axis=1
-    )
+    sale_date = create_sale_date_series(df['year'], df['month']).rename('sale_date')
     # Проверяем результат
-    successful_dates = df['sale_date'].notna().sum()
-    failed_dates = df['sale_date'].isna().sum()
+    failed_dates = sale_date.isna()
 
-    if failed_dates > 0:
+    if failed_dates.any():
         print("Проблемные записи:")
-        problem_rows = df[df['sale_date'].isna()][['year', 'month']].head()
+        problem_rows = df.loc[failed_dates, ['year', 'month']].head()
         print(problem_rows)
 
-    return df
+    return sale_date
 
 
 def remove_original_columns(df):
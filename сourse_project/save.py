@@ -1,10 +1,62 @@
-def save(df):
-    # После всех обработок данных
-    output_filename = 'processed_data.csv'
+import os
+import shutil
+
+SAVE_FORMATS = ['csv', 'parquet', 'feather']
+
+
+def add_partition_columns(df):
+    """
+    Добавляет год и месяц продажи (строками вида '2019' и '03') для разбиения набора файлов по датам.
+    Строки без даты продажи попадают в раздел 'unknown'
+    """
+    return df.assign(sale_year=df['sale_date'].dt.strftime('%Y').fillna('unknown'),
+                     sale_month=df['sale_date'].dt.strftime('%m').fillna('unknown'))
+
+
+def write_parquet(df, output_dir, append=False, partition_by_date=False):
+    """
+    Пишет Parquet-набор в каталог: каждый вызов добавляет новые файлы,
+    с partition_by_date файлы раскладываются по подкаталогам sale_year=/sale_month=
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not append and os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    partition_cols = None
+    if partition_by_date:
+        df = add_partition_columns(df)
+        partition_cols = ['sale_year', 'sale_month']
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, output_dir, partition_cols=partition_cols)
+
+
+def save(df, output_filename=None, append=False, file_format='csv', partition_by_date=False):
+    """
+    Сохраняет результат в CSV, Parquet или Feather.
+    Parquet и Feather сохраняют категориальные типы и Int64; Parquet пишется набором файлов
+    в каталог и может быть разбит по году и месяцу продажи.
+    С append=True строки дописываются к уже сохраненным
+    """
+    if output_filename is None:
+        output_filename = f'processed_data.{file_format}'
     # Сохраняем DataFrame
     try:
-        df.to_csv(output_filename, index=False, encoding='utf-8-sig')
+        if file_format not in SAVE_FORMATS:
+            raise ValueError(f"Неизвестный формат: {file_format}, доступны: {SAVE_FORMATS}")
+        if partition_by_date and file_format != 'parquet':
+            raise ValueError("Разбиение по дате поддерживается только для parquet")
+
+        if file_format == 'csv':
+            df.to_csv(output_filename, index=False, encoding='utf-8-sig',
+                      mode='a' if append else 'w', header=not append)
+        elif file_format == 'parquet':
+            write_parquet(df, output_filename, append=append, partition_by_date=partition_by_date)
+        else:
+            if append:
+                raise ValueError("Feather не поддерживает дозапись, используйте parquet")
+            df.reset_index(drop=True).to_feather(output_filename)
         print(f"Результат сохранён в файл: {output_filename}")
         print(f"Всего записей: {len(df)}")
     except Exception as e:
-        print(f"Ошибка при сохранении: {e}")
\ No newline at end of file
+        print(f"Ошибка при сохранении: {e}")
@@ -0,0 +1,255 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import types
+import pandas as pd
+from profiling import *
+
+# Каталог с модулями проекта: код стадий ищется только в нем
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_digest(path, block_size=2 ** 20):
+    """
+    SHA-256 содержимого файла
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_names(code):
+    """
+    Имена, на которые ссылается код, включая вложенные функции и lambda
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= code_names(const)
+    return names
+
+
+def project_file(obj):
+    """
+    Файл проекта, в котором определен объект, или None для библиотек
+    """
+    try:
+        path = os.path.abspath(inspect.getsourcefile(obj))
+    except TypeError:
+        return None
+    return path if os.path.dirname(path) == PROJECT_DIR else None
+
+
+def stage_dependencies(func, files=None, params=None, seen=None):
+    """
+    Собирает файлы проекта, код которых использует стадия (напрямую или через вызываемые функции),
+    значения параметров из замыканий и глобальные константы
+    """
+    files = set() if files is None else files
+    params = [] if params is None else params
+    seen = set() if seen is None else seen
+    if id(func) in seen or not isinstance(func, types.FunctionType):
+        return files, params
+    seen.add(id(func))
+    path = project_file(func)
+    if path is None:
+        return files, params
+    files.add(path)
+
+    for cell in func.__closure__ or []:
+        value = cell.cell_contents
+        if isinstance(value, types.FunctionType):
+            stage_dependencies(value, files, params, seen)
+        else:
+            params.append(value)
+    for name in sorted(code_names(func.__code__)):
+        value = func.__globals__.get(name)
+        # Функции с lru_cache и другими обертками functools - по исходной функции
+        value = getattr(value, '__wrapped__', value)
+        if isinstance(value, types.FunctionType):
+            stage_dependencies(value, files, params, seen)
+        elif isinstance(value, (dict, list, tuple, str, int, float)):
+            # Глобальные таблицы и константы (например, загруженные из data/) - как параметры
+            params.append(value)
+        elif isinstance(value, type):
+            # Классы проекта, объекты которых создает стадия (например, Deduplicator)
+            class_dependencies(value, files, params, seen)
+        elif value is not None and not isinstance(value, types.ModuleType):
+            # Объекты классов проекта (например, нормализатор дилеров) зависят от кода класса,
+            # а объекты с __getstate__ (наборы правил) - еще и от своего состояния
+            if class_dependencies(type(value), files, params, seen) and '__getstate__' in type(value).__dict__:
+                params.append(value)
+    return files, params
+
+
+def class_dependencies(cls, files, params, seen):
+    """
+    Добавляет зависимости класса проекта: его файл и все, что используют его методы.
+    Возвращает False для классов библиотек
+    """
+    if project_file(cls) is None:
+        return False
+    for base in cls.__mro__:
+        path = project_file(base)
+        if path is None:
+            continue
+        files.add(path)
+        for attr in base.__dict__.values():
+            # classmethod и staticmethod хранят функцию в __func__
+            stage_dependencies(getattr(attr, '__func__', attr), files, params, seen)
+    return True
+
+
+def value_digest(value):
+    """
+    Отпечаток значения параметра
+    """
+    try:
+        return hashlib.sha256(pickle.dumps(value, protocol=4)).hexdigest()
+    except Exception:
+        pass
+    # Таблицы функций (например, PREPROCESSORS с lambda) не сериализуются, а repr функции
+    # содержит адрес в памяти: функция представлена именем, ее код учтен в файлах стадии
+    if isinstance(value, dict):
+        text = ''.join(value_digest(key) + value_digest(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        text = ''.join(value_digest(item) for item in value)
+    elif isinstance(value, types.FunctionType):
+        text = f'{value.__module__}.{value.__qualname__}'
+    else:
+        text = repr(value)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def stage_key(previous_key, name, func):
+    """
+    Ключ результата стадии: ключ ее входа (результата предыдущей стадии или хэш исходного файла),
+    исходный код используемых модулей проекта и параметры
+    """
+    files, params = stage_dependencies(func)
+    digest = hashlib.sha256()
+    digest.update(previous_key.encode())
+    digest.update(name.encode())
+    for path in sorted(files):
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_digest(path).encode())
+    for value in params:
+        digest.update(value_digest(value).encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Кэш результатов стадий в Parquet-файлах, адресуемых ключом stage_key.
+    Общий размер ограничен max_bytes: при превышении удаляются давно не использованные файлы
+    """
+
+    def __init__(self, cache_dir='.stage_cache', max_bytes=2 * 2 ** 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        """
+        Файл результата стадии
+        """
+        return os.path.join(self.cache_dir, f'{key}.parquet')
+
+    def state_path(self, key):
+        """
+        Файл состояния процесса после стадии (счетчики, которые стадия накапливает помимо результата)
+        """
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get_state(self, key):
+        """
+        Сохраненное состояние после стадии или None
+        """
+        path = self.state_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def get(self, key):
+        """
+        Результат стадии из кэша или None
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        # Время изменения файла служит временем последнего использования для вытеснения
+        os.utime(path)
+        return pd.read_parquet(path)
+
+    def put(self, key, df, state=None):
+        """
+        Сохраняет результат стадии (и состояние state, если задано) и вытесняет старые записи сверх лимита
+        """
+        if not isinstance(df, pd.DataFrame):
+            return
+        if state is not None:
+            # Состояние пишется раньше результата: результат без состояния не будет использован
+            with open(self.state_path(key), 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+        path = self.path(key)
+        tmp_path = f'{path}.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Удаляет давно не использованные файлы, пока размер кэша больше max_bytes
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, file_name))
+            state_path = self.state_path(file_name[:-len('.parquet')])
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            total -= size
+
+    def run(self, stages, root_key, runner=None, snapshot=None, restore=None):
+        """
+        Выполняет стадии, начиная с первой, результата которой нет в кэше:
+        берется последний сохраненный результат, остальные стадии выполняются и сохраняются.
+        snapshot() возвращает состояние процесса, накопленное стадиями (JSON), оно сохраняется
+        после каждой стадии; restore(state) восстанавливает его, когда стадии берутся из кэша
+        """
+        keys = []
+        key = root_key
+        for name, func in stages:
+            key = stage_key(key, name, func)
+            keys.append(key)
+
+        df = None
+        start = 0
+        for i in reversed(range(len(stages))):
+            state = self.get_state(keys[i]) if restore is not None else None
+            if restore is not None and state is None:
+                continue
+            cached = self.get(keys[i])
+            if cached is not None:
+                if restore is not None:
+                    restore(state)
+                df = cached
+                start = i + 1
+                print(f"Результат стадий до «{stages[i][0]}» включительно взят из кэша")
+                break
+
+        for (name, func), key in zip(stages[start:], keys[start:]):
+            df = run_stages(df, [(name, func)], runner)
+            self.put(key, df, snapshot() if snapshot is not None else None)
+        return df
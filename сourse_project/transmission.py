@@ -1,34 +1,16 @@
-import re
-import pandas as pd
+from rule_engine import *
 
+# Правила коробки передач из data/normalization_rules.json: автомат имеет приоритет над механикой,
+# поиск - только в первой строке значения
+TRANSMISSION_RULES = NORMALIZATION_RULES['transmission_box']
 
-def classify_transmission_simple(transmission):
-    if pd.isna(transmission):
-        return 'Unknown'
-
-    transmission = str(transmission).upper()
-
-    # Паттерны для автоматической трансмиссии
-    auto_patterns = [
-        r'.*АКП.*', r'.*АТ.*', r'.*A[ТT].*', r'.*CVT.*', r'.*DCT.*',
-        r'.*DSG.*', r'.*TIPTRONIC.*', r'.*STEPTRONIC.*', r'.*PDK.*',
-        r'.*AUTOMATIC.*', r'.*A/T.*', r'.*ВАРИАТОР.*', r'.*AMT.*',
-        r'^\d+[АТA]$', r'^\d+[АТA].*', r'.*TRONIC.*'
-    ]
 
-    # Паттерны для механической трансмиссии
-    manual_patterns = [
-        r'.*МКП.*', r'.*МТ.*', r'.*M[ТT].*', r'.*M/T.*', r'.*МЕХ.*',
-        r'.*MANUAL.*', r'^\d+[МMТT]$', r'^\d+[МMТT].*'
-    ]
-
-    # Проверяем паттерны
-    for pattern in auto_patterns:
-        if re.match(pattern, transmission, re.IGNORECASE):
-            return 'Автомат'
+def classify_transmission_simple(transmission):
+    return TRANSMISSION_RULES(transmission)
 
-    for pattern in manual_patterns:
-        if re.match(pattern, transmission, re.IGNORECASE):
-            return 'Механика'
 
-    return 'Unknown'
\ No newline at end of file
+def classify_transmission_series(series):
+    """
+    Классифицирует столбец коробок передач, проверяя правила один раз на уникальное значение
+    """
+    return TRANSMISSION_RULES.apply(series)
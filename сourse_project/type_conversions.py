@@ -1,32 +1,119 @@
+import numpy as np
 import pandas as pd
 
+# Столбцы, которые final_data_type_conversions переводит в категориальный тип
+CATEGORICAL_COLUMNS = [
+    'fuel_type',
+    'transmission_box',
+    'drive_type',
+    'segment_2013',
+    'class_2013'
+]
+
+# Текстовые столбцы итогового датафрейма, для которых собираются общие словари значений
+DICTIONARY_COLUMNS = ['dealer_name', 'brand', 'model', 'region', 'area', 'country_of_origin', 'fuel_type',
+                      'transmission_box', 'drive_type', 'segment_2013', 'class_2013']
+
+# Текстовый столбец становится категориальным, если уникальных значений не больше этой доли строк
+MAX_UNIQUE_RATIO = 0.5
+
+
 def final_data_type_conversions(df):
     """
-    Выполняет финальные преобразования типов данных в датафрейме.
+    Переводит текстовые признаки в категориальный тип.
+    Возвращает словарь новых столбцов, датафрейм не копируется
     """
-
-    # Создаем копию датафрейма, чтобы не изменять оригинал
-    df_transformed = df.copy()
-
     # Преобразование категориальных столбцов
-    categorical_columns = [
-        'fuel_type',
-        'transmission_box',
-        'drive_type',
-        'segment_2013',
-        'class_2013'
-    ]
-
-    for col in categorical_columns:
-        if col in df_transformed.columns:
-            # Преобразуем в строковый тип сначала (на случай, если есть нестроковые значения)
-            df_transformed[col] = df_transformed[col].astype(str)
-            # Затем в категориальный тип
-            df_transformed[col] = pd.Categorical(df_transformed[col])
+    converted = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            # Преобразуем в строковый тип сначала (на случай, если есть нестроковые значения),
+            # затем в категориальный тип
+            converted[col] = pd.Series(pd.Categorical(df[col].astype(str)), index=df.index, name=col)
             print(f"Столбец '{col}' преобразован в категориальный тип")
-            print(f"  Категории: {df_transformed[col].cat.categories.tolist()}")
-            print(f"  Количество уникальных значений: {df_transformed[col].nunique()}")
+            print(f"  Категории: {converted[col].cat.categories.tolist()}")
+            print(f"  Количество уникальных значений: {converted[col].nunique()}")
         else:
             print(f"Столбец '{col}' не найден в датафрейме")
 
-    return df_transformed
\ No newline at end of file
+    return converted
+
+
+# Типы числовых столбцов итогового DataFrame. Цены остаются float64:
+# целые центы заняли бы столько же (сумма продажи не помещается в int32)
+COMPACT_NUMERIC_DTYPES = {
+    'year_of_release': 'Int16',
+    'quantity': 'int32',
+    'engine_volume': 'float32'
+}
+
+
+def fits_dtype(values, dtype):
+    """
+    Помещаются ли целые значения в тип dtype
+    """
+    # Для nullable-типов ('Int16') границы те же, что у numpy-типа
+    info = np.iinfo(dtype.lower())
+    return values.isna().all() or (values.min() >= info.min and values.max() <= info.max)
+
+
+def update_dictionaries(dictionaries, df, report=True):
+    """
+    Добавляет в словари значения столбцов DICTIONARY_COLUMNS (для CATEGORICAL_COLUMNS - в том виде,
+    который дает final_data_type_conversions) и с report=True сообщает о новых значениях
+    """
+    for col in DICTIONARY_COLUMNS:
+        if col not in df.columns:
+            continue
+        known = set(dictionaries.get(col) or [])
+        column = df[col] if col in CATEGORICAL_COLUMNS else df[col].dropna()
+        values = set(column.astype(str).unique())
+        new_values = values - known
+        if report and new_values and known:
+            print(f"Новые значения в столбце {col}: {len(new_values)} ({', '.join(sorted(new_values)[:5])})")
+        dictionaries[col] = sorted(known | values)
+    return dictionaries
+
+
+def choose_dictionaries(dictionaries, n_rows, max_unique_ratio=MAX_UNIQUE_RATIO):
+    """
+    Один раз по всем данным решает, какие столбцы станут категориальными: столбцу со слишком
+    большим словарем (больше max_unique_ratio от n_rows) вместо словаря ставится None
+    """
+    return {col: (None if col not in CATEGORICAL_COLUMNS and len(values) > max_unique_ratio * n_rows
+                  else values) for col, values in dictionaries.items()}
+
+
+def optimize_dtypes(df, dictionaries=None, max_unique_ratio=MAX_UNIQUE_RATIO):
+    """
+    Компактные типы для итогового датафрейма. Возвращает словарь новых столбцов.
+    Текстовые столбцы с небольшим числом значений становятся категориальными с отсортированным
+    словарем. dictionaries - общие словари значений по столбцам (из состояния инкрементального
+    режима или первого прохода потокового): столбец из dictionaries становится категориальным
+    с общими категориями во всех частях, а со словарем None остается строковым.
+    Числа переводятся в типы меньшей разрядности из COMPACT_NUMERIC_DTYPES
+    """
+    dictionaries = dictionaries or {}
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        is_categorical = isinstance(values.dtype, pd.CategoricalDtype)
+        if values.dtype != object and not is_categorical:
+            continue
+        uniques = values.dropna().unique()
+        if col in dictionaries:
+            # Решение уже принято по всем данным
+            if dictionaries[col] is None and not is_categorical:
+                continue
+        elif not is_categorical and len(uniques) > max_unique_ratio * len(values):
+            continue
+        categories = sorted(set(uniques) | set(dictionaries.get(col) or []), key=str)
+        converted[col] = pd.Series(pd.Categorical(values, categories=categories), index=df.index, name=col)
+
+    for col, dtype in COMPACT_NUMERIC_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype.lower().startswith('int') and not fits_dtype(df[col], dtype):
+            continue
+        converted[col] = df[col].astype(dtype)
+    return converted
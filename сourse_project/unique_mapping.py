@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+# Значение na_value по умолчанию: пропуск обрабатывается самой функцией
+CALL_FUNC = object()
+
+
+def map_unique(series, func, na_value=CALL_FUNC, categorical=False):
+    """
+    Применяет функцию нормализации к каждому уникальному значению столбца один раз
+    и раскладывает результаты обратно по строкам.
+    na_value - результат для пропусков (по умолчанию func(np.nan)).
+    С categorical=True возвращается категориальный столбец: строки получают результат
+    по кодам категорий без создания значения для каждой строки
+    """
+    codes, uniques = pd.factorize(series)
+    results = np.empty(len(uniques) + 1, dtype=object)
+    results[:-1] = [func(value) for value in uniques]
+    # Код -1 у pd.factorize означает пропуск - он попадает в последний элемент
+    if (codes == -1).any():
+        results[-1] = func(np.nan) if na_value is CALL_FUNC else na_value
+    else:
+        results[-1] = np.nan
+
+    if categorical:
+        mapped = pd.Categorical(results)
+        values = pd.Categorical.from_codes(mapped.codes[codes], categories=mapped.categories)
+    else:
+        values = results[codes]
+    return pd.Series(values, index=series.index, name=series.name)
@@ -1,29 +1,68 @@
+import re
+import numpy as np
 import pandas as pd
+from unique_mapping import map_unique
 
+# Самый ранний допустимый год выпуска
+MIN_YEAR_OF_RELEASE = 1900
 
-def clean_year_column(df, column_name='year_of_release'):
-    # Создаем копию колонки как строку
-    years = df[column_name].astype(str)
+# На сколько лет год выпуска может опережать год продажи. По умолчанию 0: возраст автомобиля
+# не бывает отрицательным. 1 сохраняет продажи моделей следующего модельного года
+MAX_YEARS_AHEAD = 0
 
-    # Удаляем неразрывные пробелы и другие артефакты
-    years = years.str.replace('\xa0', '')  # неразрывный пробел
-    years = years.str.replace(' ', '')  # обычный пробел
-    years = years.str.replace('\\', '')  # обратный слеш
-    years = years.str.replace('x', '')  # буква x
+# Все, кроме цифр: пробелы, '\\', 'x', 'г.' и т.п.
+NON_DIGITS = re.compile(r'[^0-9]')
 
-    # Удаляем все нецифровые символы
-    years = years.str.replace(r'[^0-9]', '', regex=True)
 
-    # Преобразуем в число, пустые строки
-    years_numeric = pd.to_numeric(years, errors='coerce')
+def year_digits(value):
+    """
+    Цифры года из строки: все нецифровые символы удаляются за один проход
+    """
+    return NON_DIGITS.sub('', str(value))
 
-    # Оставляем только разумные годы (например, 1900-2025)
-    years_numeric = years_numeric[(years_numeric >= 1900) & (years_numeric <= 2025)]
 
-    # Обновляем колонку в датафрейме
-    df[column_name] = years_numeric
+def parse_year(value):
+    """
+    Год из строки или NaN, если цифр нет
+    """
+    digits = year_digits(value)
+    return float(digits) if digits else np.nan
 
-    # Преобразуем в Int64
-    df[column_name] = df[column_name].astype('Int64')
 
-    return df
\ No newline at end of file
+def max_sale_year(df):
+    """
+    Последний год продажи в данных или NaN, если дат продажи нет
+    """
+    if 'sale_date' not in df.columns:
+        return np.nan
+    return float(df['sale_date'].dt.year.max())
+
+
+def max_years_of_release(df, max_years_ahead=MAX_YEARS_AHEAD, last_sale_year=None):
+    """
+    Верхняя граница года выпуска для каждой строки - год продажи плюс max_years_ahead.
+    Строки без даты продажи ограничены последним годом продажи last_sale_year (по умолчанию - по df),
+    а не текущей датой, чтобы результат не зависел от дня запуска. Без дат продажи граница - NaN
+    и год выпуска считается пропуском
+    """
+    last_sale_year = max_sale_year(df) if last_sale_year is None else last_sale_year
+    if 'sale_date' not in df.columns:
+        years = np.full(len(df), last_sale_year, dtype='float64')
+    else:
+        years = df['sale_date'].dt.year.fillna(last_sale_year).to_numpy(dtype='float64')
+    return years + max_years_ahead
+
+
+def clean_year_column(df, column_name='year_of_release', min_year=MIN_YEAR_OF_RELEASE,
+                      max_years_ahead=MAX_YEARS_AHEAD, last_sale_year=None):
+    # Год разбирается по уникальным значениям: их гораздо меньше, чем строк
+    years = map_unique(df[column_name], parse_year, na_value=np.nan).to_numpy(dtype='float64')
+
+    # Оставляем только годы от min_year до года продажи плюс max_years_ahead
+    valid = (years >= min_year) & (years <= max_years_of_release(df, max_years_ahead, last_sale_year))
+
+    # Сразу компактный Int16: значения и маска пропусков
+    values = np.where(valid, years, 0).astype('int16')
+    df[column_name] = pd.arrays.IntegerArray(values, ~valid)
+
+    return df